@@ -0,0 +1,352 @@
+import argparse
+import glob
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+import flight_log
+import geo
+
+_PHASES = ("taxi", "climb", "cruise", "descent")
+_FIELDS = (
+    "altitude_ft",
+    "airspeed_kt",
+    "vertical_speed_fpm",
+    "latitude",
+    "longitude",
+    "pitch_deg",
+    "bank_deg",
+    "fuel_total_gal",
+)
+
+
+class _Limit:
+    # One exceedance rule: counts entries past `limit`, time spent past it
+    # and the worst value seen.
+    def __init__(self, name, limit, sign=1.0):
+        self.name = name
+        self.limit = limit
+        self.sign = sign
+        self.events = 0
+        self.seconds = 0.0
+        self.worst = None
+        self._inside = False
+
+    def check(self, value, dt):
+        if value != value:
+            return
+        value *= self.sign
+        if value > self.limit:
+            if not self._inside:
+                self.events += 1
+                self._inside = True
+            self.seconds += dt
+            if self.worst is None or value > self.worst:
+                self.worst = value
+        else:
+            self._inside = False
+
+    def summary(self):
+        worst = None if self.worst is None else self.worst * self.sign
+        return {
+            "limit": self.limit * self.sign,
+            "events": self.events,
+            "seconds": round(self.seconds, 1),
+            "worst": worst,
+        }
+
+
+class FlightAnalysis:
+    # Single pass over a flight's samples with O(1) state. Phases need to hold
+    # for `min_phase_seconds` before they are confirmed; the samples seen while
+    # a new phase is pending are credited to it once confirmed, so brief
+    # excursions (a bump in a climb) do not split the flight.
+    def __init__(
+        self,
+        max_bank=45.0,
+        max_pitch_up=25.0,
+        max_pitch_down=15.0,
+        taxi_speed_kt=40.0,
+        taxi_altitude_ft=1000.0,
+        max_field_elevation_ft=15000.0,
+        climb_fpm=300.0,
+        min_phase_seconds=30.0,
+        max_gap_seconds=10.0,
+        max_speed_kt=1500.0,
+    ):
+        self._taxi_speed = taxi_speed_kt
+        self._taxi_altitude = taxi_altitude_ft
+        self._max_field_elevation = max_field_elevation_ft
+        self._ground = None
+        self._climb_fpm = climb_fpm
+        self._min_phase = min_phase_seconds
+        self._max_gap = max_gap_seconds
+        self._max_speed = max_speed_kt
+        self._limits = [
+            _Limit("bank", max_bank),
+            _Limit("bank", max_bank, -1.0),
+            _Limit("pitch_up", max_pitch_up),
+            _Limit("pitch_down", max_pitch_down, -1.0),
+        ]
+        self._phases = {phase: [0.0, 0.0, 0.0] for phase in _PHASES}
+        self._phase = None
+        self._pending = None
+        self._pending_since = None
+        self._pending_totals = [0.0, 0.0, 0.0]
+        self._last = None
+        self._position = None
+        self.samples = 0
+        self.start = None
+        self.end = None
+        self.max_altitude = None
+        self.max_bank = 0.0
+        self.max_pitch = None
+        self.min_pitch = None
+
+    def feed(self, times, columns):
+        # `columns` maps field -> column for one chunk; missing fields are NaN.
+        nan = itertools.repeat(math.nan)
+        series = [columns.get(key, nan) for key in _FIELDS]
+        for row in zip(times, *series):
+            self._sample(*row)
+
+    def _sample(self, t, altitude, airspeed, vs, latitude, longitude, pitch, bank, fuel):
+        self.samples += 1
+        if self.start is None:
+            self.start = t
+        self.end = t
+        if altitude == altitude and (self.max_altitude is None or altitude > self.max_altitude):
+            self.max_altitude = altitude
+        if bank == bank and abs(bank) > self.max_bank:
+            self.max_bank = abs(bank)
+        if pitch == pitch:
+            if self.max_pitch is None or pitch > self.max_pitch:
+                self.max_pitch = pitch
+            if self.min_pitch is None or pitch < self.min_pitch:
+                self.min_pitch = pitch
+        phase = self._classify(airspeed, vs, altitude)
+        distance = self._advance(t, latitude, longitude)
+        last, self._last = self._last, (t, fuel)
+        if last is None:
+            self._phase = phase
+            return
+        dt = t - last[0]
+        if dt <= 0 or dt > self._max_gap:
+            # Recorder paused or clock jumped: nothing is attributed to the gap.
+            return
+        burned = 0.0
+        if fuel == fuel and last[1] == last[1] and fuel < last[1]:
+            # Increases are refuelling and never count as negative burn.
+            burned = last[1] - fuel
+        for limit in self._limits:
+            limit.check(bank if limit.name == "bank" else pitch, dt)
+        self._attribute(phase, t, dt, distance, burned)
+
+    def _advance(self, t, latitude, longitude):
+        # Distance from the last usable position. Samples without one (NaN, or
+        # the 0/0 the readers report before the sim has a position) are
+        # skipped; a hop faster than max_speed_kt is a slew or teleport.
+        if latitude != latitude or longitude != longitude:
+            return 0.0
+        if latitude == 0.0 and longitude == 0.0:
+            return 0.0
+        position, self._position = self._position, (t, latitude, longitude)
+        if position is None:
+            return 0.0
+        span = t - position[0]
+        if span <= 0 or span > self._max_gap:
+            return 0.0
+        distance = geo.haversine_nm(position[1], position[2], latitude, longitude)
+        if distance / span * 3600.0 > self._max_speed:
+            return 0.0
+        return distance
+
+    def _classify(self, airspeed, vs, altitude):
+        if airspeed == airspeed and airspeed < self._taxi_speed and self._near_ground(altitude):
+            if altitude == altitude:
+                self._ground = altitude
+            return "taxi"
+        if vs != vs:
+            return self._phase or "cruise"
+        if vs > self._climb_fpm:
+            return "climb"
+        if vs < -self._climb_fpm:
+            return "descent"
+        return "cruise"
+
+    def _near_ground(self, altitude):
+        # The logs carry no on-ground flag. The ground is where the aircraft
+        # last taxied; slow flight well away from it (a hold, a hover, a paused
+        # sim) only counts as taxi on the first sample or right after a descent
+        # (a landing at another field), and never above the highest airports.
+        if altitude != altitude:
+            return True
+        if self._ground is not None and abs(altitude - self._ground) <= self._taxi_altitude:
+            return True
+        return altitude <= self._max_field_elevation and self._phase in (None, "descent")
+
+    def _attribute(self, phase, t, dt, distance, burned):
+        if phase == self._phase:
+            if self._pending is not None:
+                # The candidate phase did not last; its samples stay here.
+                self._credit(self._phase, self._pending_totals)
+                self._pending = None
+            self._credit(self._phase, (dt, distance, burned))
+            return
+        if phase != self._pending:
+            if self._pending is not None:
+                self._credit(self._phase, self._pending_totals)
+            self._pending = phase
+            self._pending_since = t - dt
+            self._pending_totals = [0.0, 0.0, 0.0]
+        totals = self._pending_totals
+        totals[0] += dt
+        totals[1] += distance
+        totals[2] += burned
+        if t - self._pending_since >= self._min_phase:
+            self._phase = phase
+            self._credit(phase, totals)
+            self._pending = None
+
+    def _credit(self, phase, totals):
+        bucket = self._phases[phase]
+        bucket[0] += totals[0]
+        bucket[1] += totals[1]
+        bucket[2] += totals[2]
+
+    def summary(self):
+        if self._pending is not None:
+            self._credit(self._phase, self._pending_totals)
+            self._pending = None
+        phases = {
+            phase: {
+                "seconds": round(seconds, 1),
+                "distance_nm": round(distance, 2),
+                "fuel_gal": round(fuel, 2),
+            }
+            for phase, (seconds, distance, fuel) in self._phases.items()
+        }
+        exceedances = {}
+        for limit in self._limits:
+            key = limit.name if limit.name != "bank" else ("bank_right" if limit.sign > 0 else "bank_left")
+            exceedances[key] = limit.summary()
+        return {
+            "samples": self.samples,
+            "start": self.start,
+            "duration_s": round((self.end - self.start) if self.samples else 0.0, 1),
+            "distance_nm": round(sum(item["distance_nm"] for item in phases.values()), 2),
+            "fuel_gal": round(sum(item["fuel_gal"] for item in phases.values()), 2),
+            "max_altitude_ft": self.max_altitude,
+            "max_bank_deg": self.max_bank,
+            "max_pitch_deg": self.max_pitch,
+            "min_pitch_deg": self.min_pitch,
+            "phases": phases,
+            "exceedances": exceedances,
+        }
+
+
+def analyze_file(path, options=None):
+    # Streams the log one chunk at a time, so memory stays flat however long
+    # the flight. Errors are reported per file rather than failing the batch.
+    analysis = FlightAnalysis(**(options or {}))
+    try:
+        for fields, times, columns in flight_log.iter_chunks(path):
+            analysis.feed(times, dict(zip(fields, columns)))
+    except (OSError, ValueError) as exc:
+        return {"path": path, "error": str(exc)}
+    result = analysis.summary()
+    result["path"] = path
+    return result
+
+
+def _analyze_job(job):
+    return analyze_file(*job)
+
+
+def _expand(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*" + flight_log.EXTENSION))))
+        else:
+            files.append(path)
+    return files
+
+
+def _print_table(results):
+    header = (
+        f"{'flight':<32} {'dur min':>8} {'dist nm':>8} {'fuel gal':>8} {'max alt':>8} "
+        f"{'taxi':>6} {'climb':>6} {'cruise':>6} {'desc':>6} {'bank':>5} {'pitch':>5}"
+    )
+    print(header)
+    for result in results:
+        name = os.path.basename(result["path"])[:32]
+        if "error" in result:
+            print(f"{name:<32} error: {result['error']}")
+            continue
+        phases = result["phases"]
+        minutes = [phases[phase]["seconds"] / 60.0 for phase in _PHASES]
+        exceed = result["exceedances"]
+        bank_events = exceed["bank_left"]["events"] + exceed["bank_right"]["events"]
+        pitch_events = exceed["pitch_up"]["events"] + exceed["pitch_down"]["events"]
+        altitude = result["max_altitude_ft"]
+        print(
+            f"{name:<32} {result['duration_s'] / 60.0:>8.1f} {result['distance_nm']:>8.1f} "
+            f"{result['fuel_gal']:>8.1f} {altitude if altitude is not None else math.nan:>8.0f} "
+            + " ".join(f"{value:>6.1f}" for value in minutes)
+            + f" {bank_events:>5} {pitch_events:>5}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarize recorded flight logs (.fdl): phases, exceedances, fuel, distance"
+    )
+    parser.add_argument("paths", nargs="+", help="flight logs or directories of them")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", action="store_true", help="one JSON object per flight")
+    parser.add_argument("--max-bank", type=float, default=45.0)
+    parser.add_argument("--max-pitch-up", type=float, default=25.0)
+    parser.add_argument("--max-pitch-down", type=float, default=15.0)
+    parser.add_argument("--min-phase-seconds", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    files = _expand(args.paths)
+    if not files:
+        print("no flight logs found", file=sys.stderr)
+        return 1
+    options = {
+        "max_bank": args.max_bank,
+        "max_pitch_up": args.max_pitch_up,
+        "max_pitch_down": args.max_pitch_down,
+        "min_phase_seconds": args.min_phase_seconds,
+    }
+    started = time.perf_counter()
+    jobs = [(path, options) for path in files]
+    if args.jobs > 1 and len(files) > 1:
+        with multiprocessing.Pool(min(args.jobs, len(files))) as pool:
+            results = list(pool.imap(_analyze_job, jobs))
+    else:
+        results = [_analyze_job(job) for job in jobs]
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        _print_table(results)
+        samples = sum(result.get("samples", 0) for result in results)
+        print(
+            f"{len(results)} flights, {samples} samples in {elapsed:.2f} s "
+            f"({args.jobs} jobs)",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,559 @@
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import gui
+import udp_receiver
+
+
+def _raise_fd_limit():
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = 16384 if hard == resource.RLIM_INFINITY else min(hard, 16384)
+    if soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_stats(pid):
+    # Linux only: CPU seconds and thread count of the server process.
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="ascii") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        threads = int(fields[17])
+        return cpu, threads
+    except (OSError, ValueError, IndexError):
+        return None, None
+
+
+def _sample_threads(pid, done, peak):
+    while not done.wait(0.1):
+        _cpu, threads = _process_stats(pid)
+        if threads is not None:
+            peak.append(threads)
+
+
+def cmd_serve(args):
+    _raise_fd_limit()
+    store = gui.DataStore()
+    collector = gui.DataCollector(
+        store,
+        rate_hz=args.rate,
+        source=args.source,
+        replay_file=args.replay_file,
+        replay_speed=args.replay_speed,
+    )
+    collector.start_collecting()
+    server = gui.DataServer(
+        "127.0.0.1",
+        args.port,
+        store,
+        static_dir=os.path.dirname(os.path.abspath(__file__)),
+        backend=args.backend,
+        max_connections=args.max_connections,
+    )
+    server.start()
+
+
+async def _client(host, port, path, deadline, latencies, errors):
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("ascii")
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+            length = 0
+            for line in head.split("\r\n"):
+                if line.startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if head.startswith("http/1.0") or "connection: close" in head:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append(1)
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def _load(host, port, path, clients, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        *(_client(host, port, path, deadline, latencies, errors) for _ in range(clients))
+    )
+    return latencies, len(errors)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def _read_head(reader):
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+    length = 0
+    for line in head.split("\r\n"):
+        if line.startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    return head, length
+
+
+async def _poll_client(host, port, deadline, interval, stats):
+    reader = writer = None
+    version = epoch = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            path = "/data" if version is None else f"/data?since={epoch}-{version}"
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("ascii"))
+            await writer.drain()
+            head, length = await _read_head(reader)
+            body = await reader.readexactly(length) if length else b""
+            received = time.time()
+            stats["bytes"] += len(head) + length
+            if head.startswith("http/1.1 200") or head.startswith("http/1.0 200"):
+                data = json.loads(body)
+                version = data.get("version", version)
+                epoch = data.get("epoch", epoch)
+                if "last_update" in data:
+                    stats["latency"].append(received - data["last_update"])
+            if head.startswith("http/1.0") or "connection: close" in head:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats["errors"] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+        await asyncio.sleep(interval)
+    if writer is not None:
+        writer.close()
+
+
+async def _stream_client(host, port, deadline, stats):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET /stream HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("ascii"))
+        await writer.drain()
+        await _read_head(reader)
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                line = await asyncio.wait_for(reader.readline(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            stats["bytes"] += len(line)
+            if line.startswith(b"data: "):
+                received = time.time()
+                stats["latency"].append(received - json.loads(line[6:])["last_update"])
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        stats["errors"] += 1
+
+
+async def _ws_client(host, port, deadline, stats):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        writer.write(
+            (
+                f"GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\n"
+                f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                "Sec-WebSocket-Version: 13\r\n\r\n"
+            ).encode("ascii")
+        )
+        message = json.dumps({"max_rate": 60}).encode("utf-8")
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(message))
+        writer.write(struct.pack("!BB", 0x81, 0x80 | len(message)) + mask + masked)
+        await writer.drain()
+        await _read_head(reader)
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                first, second = await asyncio.wait_for(reader.readexactly(2), remaining)
+            except asyncio.TimeoutError:
+                break
+            size = second & 0x7F
+            if size == 126:
+                size = struct.unpack("!H", await reader.readexactly(2))[0]
+            payload = await reader.readexactly(size)
+            stats["bytes"] += size + 2
+            if first & 0x0F == 0x2:
+                received = time.time()
+                stats["latency"].append(received - struct.unpack_from("<d", payload, 6)[0])
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        stats["errors"] += 1
+
+
+async def _pipeline_load(port, endpoint, clients, duration, poll_interval):
+    stats = {"latency": [], "bytes": 0, "errors": 0}
+    deadline = time.perf_counter() + duration
+    if endpoint == "data":
+        jobs = [
+            _poll_client("127.0.0.1", port, deadline, poll_interval, stats)
+            for _ in range(clients)
+        ]
+    elif endpoint == "stream":
+        jobs = [_stream_client("127.0.0.1", port, deadline, stats) for _ in range(clients)]
+    else:
+        jobs = [_ws_client("127.0.0.1", port, deadline, stats) for _ in range(clients)]
+    await asyncio.gather(*jobs)
+    return stats
+
+
+def _start_server(backend, port, rate, max_connections, source="mock"):
+    return subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "serve",
+            "--backend",
+            backend,
+            "--port",
+            str(port),
+            "--rate",
+            str(rate),
+            "--max-connections",
+            str(max_connections),
+            "--source",
+            source,
+        ]
+    )
+
+
+def cmd_pipeline(args):
+    # End-to-end: mock collector -> DataStore -> HTTP -> client. Latency is
+    # receive time minus the sample's last_update, so it includes the polling
+    # interval for /data clients.
+    _raise_fd_limit()
+    backends = ["threading", "asyncio"] if args.backend == "both" else [args.backend]
+    endpoints = [item for item in args.endpoints.split(",") if item]
+    print(
+        f"{'backend':<10} {'endpoint':<8} {'clients':>7} {'samples/s':>10} {'KB/s':>8} "
+        f"{'mean ms':>8} {'p99 ms':>8} {'errors':>6} {'cpu %':>6}"
+    )
+    for backend in backends:
+        for endpoint in endpoints:
+            port = _free_port()
+            child = _start_server(backend, port, args.rate, max(args.clients, 1) * 2)
+            try:
+                if not _wait_for_port(port):
+                    print(f"{backend:<10} {endpoint:<8} server did not start")
+                    continue
+                time.sleep(0.5)
+                cpu_before, _threads = _process_stats(child.pid)
+                stats = asyncio.run(
+                    _pipeline_load(
+                        port, endpoint, args.clients, args.duration, args.poll_interval
+                    )
+                )
+                cpu_after, _threads = _process_stats(child.pid)
+            finally:
+                child.terminate()
+                child.wait()
+            latency = stats["latency"]
+            mean = sum(latency) / len(latency) if latency else math.nan
+            cpu = (
+                "n/a"
+                if cpu_before is None
+                else f"{(cpu_after - cpu_before) / args.duration * 100:.0f}"
+            )
+            print(
+                f"{backend:<10} {endpoint:<8} {args.clients:>7} "
+                f"{len(latency) / args.duration:>10.0f} "
+                f"{stats['bytes'] / args.duration / 1024:>8.1f} {mean * 1000:>8.2f} "
+                f"{_percentile(latency, 0.99) * 1000:>8.2f} {stats['errors']:>6} {cpu:>6}"
+            )
+
+
+def _wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def cmd_server(args):
+    _raise_fd_limit()
+    backends = ["threading", "asyncio"] if args.backend == "both" else [args.backend]
+    counts = [int(item) for item in args.clients.split(",") if item]
+    print(
+        f"{'backend':<10} {'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'errors':>6} {'cpu s':>6} {'peak thr':>8}"
+    )
+    for backend in backends:
+        for clients in counts:
+            port = _free_port()
+            child = _start_server(backend, port, args.rate, max(clients, 1))
+            try:
+                if not _wait_for_port(port):
+                    print(f"{backend:<10} {clients:>7} server did not start")
+                    continue
+                cpu_before, _threads = _process_stats(child.pid)
+                peak = []
+                done = threading.Event()
+                sampler = threading.Thread(
+                    target=_sample_threads, args=(child.pid, done, peak), daemon=True
+                )
+                sampler.start()
+                latencies, errors = asyncio.run(
+                    _load("127.0.0.1", port, args.path, clients, args.duration)
+                )
+                done.set()
+                sampler.join()
+                cpu_after, _threads = _process_stats(child.pid)
+                threads = max(peak) if peak else None
+            finally:
+                child.terminate()
+                child.wait()
+            cpu = "n/a" if cpu_before is None else f"{cpu_after - cpu_before:.2f}"
+            print(
+                f"{backend:<10} {clients:>7} {len(latencies) / args.duration:>9.0f} "
+                f"{_percentile(latencies, 0.5) * 1000:>8.2f} "
+                f"{_percentile(latencies, 0.99) * 1000:>8.2f} {errors:>6} "
+                f"{cpu:>6} {threads if threads is not None else 'n/a':>8}"
+            )
+
+
+class _LockedStore:
+    # The DataStore read path before copy-on-write snapshots: one lock shared
+    # by the writer and every reader, a dict copy per snapshot and lazy
+    # serialization under the lock. Kept only as the benchmark baseline.
+    def __init__(self, fields=gui._FLIGHT_FIELDS):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._payload = None
+        self._data = {key: 0.0 for key in fields}
+        self._data.update({"last_update": 0.0, "source": "mock", "version": 0})
+
+    def update(self, new_data):
+        with self._lock:
+            self._version += 1
+            self._data.update(new_data)
+            self._data["last_update"] = time.time()
+            self._data["version"] = self._version
+            self._payload = None
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._data)
+
+    def payload(self):
+        with self._lock:
+            if self._payload is None:
+                self._payload = json.dumps(self._data, ensure_ascii=False).encode("utf-8")
+            return self._version, self._payload
+
+
+def _store_reader(store, done, counts, slot):
+    # One HTTP handler / UI refresh worth of reads per iteration.
+    reads = 0
+    while not done.is_set():
+        store.snapshot().get("altitude_ft")
+        store.payload()
+        reads += 1
+    counts[slot] = reads
+
+
+def _store_run(store, readers, duration, rate, fields):
+    done = threading.Event()
+    counts = [0] * readers
+    threads = [
+        threading.Thread(target=_store_reader, args=(store, done, counts, slot), daemon=True)
+        for slot in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    latencies = []
+    period = 1.0 / rate
+    deadline = time.perf_counter() + duration
+    tick = time.perf_counter()
+    index = 0
+    while tick < deadline:
+        index += 1
+        sample = {key: float(index + offset) for offset, key in enumerate(fields)}
+        started = time.perf_counter()
+        store.update(sample)
+        latencies.append(time.perf_counter() - started)
+        tick += period
+        pause = tick - time.perf_counter()
+        if pause > 0:
+            time.sleep(pause)
+    done.set()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(counts)
+
+
+def cmd_store(args):
+    # Readers hammer snapshot()/payload() while one writer updates at --rate;
+    # reports reader throughput and how long each update() call took.
+    fields = [f"field_{index}" for index in range(args.fields)]
+    print(
+        f"{'store':<8} {'readers':>7} {'reads/s':>10} {'upd p50 us':>10} "
+        f"{'upd p99 us':>10} {'upd max us':>10}"
+    )
+    for readers in [int(item) for item in args.readers.split(",") if item]:
+        for name in ("locked", "cow"):
+            if name == "locked":
+                store = _LockedStore(fields)
+            else:
+                store = gui.DataStore(fields=fields, history_capacity=1024)
+            latencies, reads = _store_run(store, readers, args.duration, args.rate, fields)
+            print(
+                f"{name:<8} {readers:>7} {reads / args.duration:>10.0f} "
+                f"{_percentile(latencies, 0.5) * 1e6:>10.1f} "
+                f"{_percentile(latencies, 0.99) * 1e6:>10.1f} "
+                f"{max(latencies) * 1e6:>10.1f}"
+            )
+
+
+def _udp_receive(receiver, done, latencies):
+    while not done.is_set():
+        sample = receiver.receive()
+        if sample is not None:
+            latencies.append(time.time() - sample[1])
+
+
+def cmd_udp(args):
+    # Loopback loss/latency of the UDP publisher: each rate runs for
+    # --duration with a mock sample; 0 means send as fast as possible.
+    print(
+        f"{'rate':>6} {'sent':>8} {'received':>8} {'lost':>6} {'dropped':>7} "
+        f"{'p50 us':>8} {'p99 us':>8} {'max us':>8}"
+    )
+    reader = gui.MockReader(rate_hz=60)
+    for rate in [float(item) for item in args.rates.split(",") if item]:
+        port = _free_port()
+        receiver = udp_receiver.UdpReceiver(port, host="127.0.0.1", timeout=0.2)
+        publisher = gui.UdpPublisher("127.0.0.1", port, max_rate_hz=0)
+        latencies = []
+        done = threading.Event()
+        thread = threading.Thread(
+            target=_udp_receive, args=(receiver, done, latencies), daemon=True
+        )
+        thread.start()
+        period = 1.0 / rate if rate > 0 else 0.0
+        deadline = time.perf_counter() + args.duration
+        tick = time.perf_counter()
+        while tick < deadline:
+            publisher.publish(time.time(), reader.read())
+            if period:
+                tick += period
+                pause = tick - time.perf_counter()
+                if pause > 0:
+                    time.sleep(pause)
+            else:
+                tick = time.perf_counter()
+        time.sleep(0.3)
+        done.set()
+        thread.join()
+        publisher.close()
+        receiver.close()
+        print(
+            f"{rate:>6.0f} {publisher.sent:>8} {receiver.received:>8} {receiver.lost:>6} "
+            f"{publisher.dropped:>7} {_percentile(latencies, 0.5) * 1e6:>8.0f} "
+            f"{_percentile(latencies, 0.99) * 1e6:>8.0f} "
+            f"{(max(latencies) if latencies else math.nan) * 1e6:>8.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flight Data Export benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    server = commands.add_parser("server", help="compare HTTP server backends under load")
+    server.add_argument("--backend", default="both", choices=["both", "threading", "asyncio"])
+    server.add_argument("--clients", default="10,100,1000")
+    server.add_argument("--duration", type=float, default=5.0)
+    server.add_argument("--path", default="/data")
+    server.add_argument("--rate", type=float, default=20.0)
+    server.set_defaults(func=cmd_server)
+
+    pipeline = commands.add_parser(
+        "pipeline", help="sample-to-client latency, throughput and server CPU"
+    )
+    pipeline.add_argument("--backend", default="both", choices=["both", "threading", "asyncio"])
+    pipeline.add_argument("--endpoints", default="data,stream,ws")
+    pipeline.add_argument("--clients", type=int, default=10)
+    pipeline.add_argument("--duration", type=float, default=5.0)
+    pipeline.add_argument("--rate", type=float, default=20.0)
+    pipeline.add_argument("--poll-interval", type=float, default=0.1)
+    pipeline.set_defaults(func=cmd_pipeline)
+
+    store = commands.add_parser("store", help="DataStore read/write contention")
+    store.add_argument("--readers", default="1,4,16")
+    store.add_argument("--fields", type=int, default=14)
+    store.add_argument("--duration", type=float, default=3.0)
+    store.add_argument("--rate", type=float, default=60.0)
+    store.set_defaults(func=cmd_store)
+
+    udp = commands.add_parser("udp", help="UDP publisher loss and latency over loopback")
+    udp.add_argument("--rates", default="60,1000,0")
+    udp.add_argument("--duration", type=float, default=3.0)
+    udp.set_defaults(func=cmd_udp)
+
+    serve = commands.add_parser("serve", help="run a collector and server without a simulator")
+    serve.add_argument("--backend", default="threading", choices=["threading", "asyncio"])
+    serve.add_argument("--port", type=int, required=True)
+    serve.add_argument("--rate", type=float, default=20.0)
+    serve.add_argument("--max-connections", type=int, default=512)
+    serve.add_argument("--source", default="mock", choices=["mock", "replay"])
+    serve.add_argument("--replay-file")
+    serve.add_argument("--replay-speed", type=float, default=1.0)
+    serve.set_defaults(func=cmd_serve)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
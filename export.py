@@ -0,0 +1,286 @@
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+
+import flight_log
+
+# Streaming converters from flight data chunks to CSV, GPX, KML and Parquet.
+# Every encoder takes an iterable of (fields, times, columns) chunks - the
+# shape flight_log.iter_chunks() and FlightHistory.iter_chunks() produce - and
+# yields encoded bytes chunk by chunk, so neither the server nor the CLI ever
+# holds a whole export in memory. A layout - (field, typecode) pairs - names
+# the columns up front, so even an export without samples has its header.
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "gpx": ("application/gpx+xml", ".gpx"),
+    "kml": ("application/vnd.google-earth.kml+xml", ".kml"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+_FEET_TO_METERS = 0.3048
+
+
+def available(fmt):
+    if fmt not in FORMATS:
+        return False
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+
+def encode(fmt, chunks, name="flight", layout=None):
+    if fmt == "csv":
+        return _encode_csv(chunks, layout)
+    if fmt == "gpx":
+        return _encode_gpx(chunks, name)
+    if fmt == "kml":
+        return _encode_kml(chunks, name)
+    if fmt == "parquet":
+        return _encode_parquet(chunks, layout)
+    raise ValueError(f"unknown export format: {fmt}")
+
+
+def select_fields(chunks, fields=None):
+    # Narrows each chunk to `fields` (in that order, unknown names dropped).
+    for chunk_fields, times, columns in chunks:
+        if fields:
+            lookup = dict(zip(chunk_fields, columns))
+            chunk_fields = [key for key in fields if key in lookup]
+            columns = [lookup[key] for key in chunk_fields]
+        yield chunk_fields, times, columns
+
+
+def select_layout(layout, fields=None):
+    # The layout counterpart of select_fields().
+    if not fields:
+        return list(layout)
+    lookup = dict(layout)
+    return [(key, lookup[key]) for key in fields if key in lookup]
+
+
+def log_layout(path):
+    with open(path, "rb") as handle:
+        fields, typecodes = flight_log.read_header(handle)
+    return list(zip(fields, typecodes))
+
+
+def _formatter(column):
+    # float32 columns (from .fdl logs) carry about 7 significant digits;
+    # printing more would only show representation noise.
+    if getattr(column, "typecode", "d") == "f":
+        return lambda value: "" if value != value else f"{value:.7g}"
+    return lambda value: "" if value != value else repr(value)
+
+
+def _encode_csv(chunks, layout=None):
+    header = None
+    if layout is not None:
+        header = [key for key, _typecode in layout]
+        yield (",".join(["time"] + header) + "\r\n").encode("utf-8")
+    for fields, times, columns in chunks:
+        if header is None:
+            header = list(fields)
+            yield (",".join(["time"] + header) + "\r\n").encode("utf-8")
+        formats = [_formatter(column) for column in columns]
+        lines = []
+        for index, timestamp in enumerate(times):
+            values = [fmt(column[index]) for fmt, column in zip(formats, columns)]
+            lines.append(repr(timestamp) + "," + ",".join(values))
+        if lines:
+            yield ("\r\n".join(lines) + "\r\n").encode("utf-8")
+    if header is None:
+        yield b"time\r\n"
+
+
+def _positions(chunks):
+    # Yields a list of (time, latitude, longitude, altitude_m) rows per chunk;
+    # samples without a position are dropped, a missing altitude is NaN.
+    for fields, times, columns in chunks:
+        lookup = dict(zip(fields, columns))
+        latitudes = lookup.get("latitude")
+        longitudes = lookup.get("longitude")
+        if latitudes is None or longitudes is None:
+            continue
+        altitudes = lookup.get("altitude_ft")
+        rows = []
+        for index, timestamp in enumerate(times):
+            latitude = latitudes[index]
+            longitude = longitudes[index]
+            if latitude != latitude or longitude != longitude:
+                continue
+            if latitude == 0.0 and longitude == 0.0:
+                # The readers report 0/0 before the sim has a position.
+                continue
+            altitude = math.nan if altitudes is None else altitudes[index] * _FEET_TO_METERS
+            rows.append((timestamp, latitude, longitude, altitude))
+        if rows:
+            yield rows
+
+
+def _iso_time(timestamp):
+    # Rounded once, so 54.9996 s becomes 55.000 rather than 54.000.
+    seconds, millis = divmod(round(timestamp * 1000.0), 1000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{millis:03d}Z"
+
+
+def _xml_text(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _encode_gpx(chunks, name):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<gpx version="1.1" creator="MSFS flight data export" '
+        'xmlns="http://www.topografix.com/GPX/1/1">\n'
+        f"<trk><name>{_xml_text(name)}</name><trkseg>\n"
+    ).encode("utf-8")
+    for rows in _positions(chunks):
+        points = []
+        for timestamp, latitude, longitude, altitude in rows:
+            elevation = "" if altitude != altitude else f"<ele>{altitude:.1f}</ele>"
+            points.append(
+                f'<trkpt lat="{latitude:.7f}" lon="{longitude:.7f}">'
+                f"{elevation}<time>{_iso_time(timestamp)}</time></trkpt>\n"
+            )
+        yield "".join(points).encode("utf-8")
+    yield b"</trkseg></trk>\n</gpx>\n"
+
+
+def _encode_kml(chunks, name):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n'
+        f"<name>{_xml_text(name)}</name><Placemark><name>{_xml_text(name)}</name>\n"
+        "<LineString><altitudeMode>absolute</altitudeMode><coordinates>\n"
+    ).encode("utf-8")
+    for rows in _positions(chunks):
+        points = []
+        for _timestamp, latitude, longitude, altitude in rows:
+            altitude = 0.0 if altitude != altitude else altitude
+            points.append(f"{longitude:.7f},{latitude:.7f},{altitude:.1f}\n")
+        yield "".join(points).encode("utf-8")
+    yield b"</coordinates></LineString></Placemark>\n</Document></kml>\n"
+
+
+class _ChunkSink:
+    # Minimal writable file for pyarrow: collects what the Parquet writer emits
+    # so it can be handed out after every row group.
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        return
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_schema(pa, layout):
+    return pa.schema(
+        [pa.field("time", pa.timestamp("us", tz="UTC"))]
+        + [
+            pa.field(key, pa.float32() if typecode == "f" else pa.float64())
+            for key, typecode in layout
+        ]
+    )
+
+
+def _encode_parquet(chunks, layout=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chunks = iter(chunks)
+    first = None
+    if layout is None:
+        # No layout given: take it from the first chunk (none: time only).
+        first = next(chunks, None)
+        layout = []
+        if first is not None:
+            layout = [
+                (key, getattr(column, "typecode", "d")) for key, column in zip(first[0], first[2])
+            ]
+        chunks = itertools.chain([first] if first is not None else [], chunks)
+    schema = _parquet_schema(pa, layout)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for fields, times, columns in chunks:
+            lookup = dict(zip(fields, columns))
+            arrays = [pa.array([int(t * 1000000.0) for t in times], pa.timestamp("us", tz="UTC"))]
+            for field in schema.names[1:]:
+                column = lookup.get(field)
+                if column is None:
+                    arrays.append(pa.nulls(len(times), schema.field(field).type))
+                    continue
+                # NaN marks a missing value in the logs; Parquet has real nulls.
+                arrays.append(pa.array(column, schema.field(field).type, from_pandas=True))
+            # One row group per chunk keeps the writer's buffer at one chunk.
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert recorded flight logs (.fdl)")
+    parser.add_argument("path", help="flight log to convert")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--fields", help="comma-separated fields (CSV/Parquet only)")
+    parser.add_argument("-o", "--output", help="output file, '-' for stdout (default: next to the log)")
+    args = parser.parse_args(argv)
+
+    if not available(args.format):
+        print(f"{args.format} export needs pyarrow (pip install pyarrow)", file=sys.stderr)
+        return 1
+    wanted = [key for key in (args.fields or "").split(",") if key]
+    try:
+        layout = select_layout(log_layout(args.path), wanted)
+    except (OSError, ValueError) as exc:
+        print(f"export failed: {exc}", file=sys.stderr)
+        return 1
+    chunks = select_fields(flight_log.iter_chunks(args.path), wanted)
+    stem = os.path.splitext(os.path.basename(args.path))[0]
+    output = args.output or os.path.splitext(args.path)[0] + FORMATS[args.format][1]
+    handle = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        for data in encode(args.format, chunks, stem, layout):
+            handle.write(data)
+    except (OSError, ValueError) as exc:
+        print(f"export failed: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if handle is not sys.stdout.buffer:
+            handle.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
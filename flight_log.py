@@ -0,0 +1,138 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+# Flight log layout (all integers little-endian):
+#   header: b"FDXL", u16 version, u16 field count, then per field u8 length,
+#           utf-8 name and a one-byte array typecode ("f" float32 or "d" float64)
+#   chunks: b"FDXC", u32 sample count, u32 payload length, zlib payload
+# A chunk payload is columnar: the float64 time column, then one column per
+# field in its declared width. Each column is byte-shuffled (all first bytes,
+# then all second bytes, ...) before compression, which lets zlib exploit
+# slowly changing flight values. Missing values are stored as NaN.
+MAGIC = b"FDXL"
+CHUNK_MAGIC = b"FDXC"
+VERSION = 1
+EXTENSION = ".fdl"
+
+_HEADER = struct.Struct("<4sHH")
+_CHUNK = struct.Struct("<4sII")
+
+
+def _shuffle(column):
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    raw = column.tobytes()
+    width = column.itemsize
+    return b"".join(raw[i::width] for i in range(width))
+
+
+def _unshuffle(raw, typecode, count):
+    width = array(typecode).itemsize
+    planes = [raw[i * count:(i + 1) * count] for i in range(width)]
+    interleaved = bytearray(width * count)
+    for i, plane in enumerate(planes):
+        interleaved[i::width] = plane
+    column = array(typecode)
+    column.frombytes(bytes(interleaved))
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+class FlightLogWriter:
+    def __init__(self, path, fields, wide_fields=(), level=6):
+        self.path = path
+        self.fields = list(fields)
+        self.typecodes = ["d" if key in wide_fields else "f" for key in self.fields]
+        self._level = level
+        self._handle = open(path, "wb")
+        header = [_HEADER.pack(MAGIC, VERSION, len(self.fields))]
+        for key, typecode in zip(self.fields, self.typecodes):
+            name = key.encode("utf-8")
+            header.append(struct.pack("<B", len(name)) + name + typecode.encode("ascii"))
+        self._handle.write(b"".join(header))
+
+    def write_chunk(self, times, columns):
+        count = len(times)
+        if not count:
+            return
+        parts = [_shuffle(array("d", times))]
+        for typecode, column in zip(self.typecodes, columns):
+            parts.append(_shuffle(array(typecode, column)))
+        payload = zlib.compress(b"".join(parts), self._level)
+        self._handle.write(_CHUNK.pack(CHUNK_MAGIC, count, len(payload)))
+        self._handle.write(payload)
+
+    def flush(self):
+        self._handle.flush()
+
+    def sync(self):
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def close(self):
+        if self._handle.closed:
+            return
+        self.sync()
+        self._handle.close()
+
+
+def read_header(handle):
+    head = handle.read(_HEADER.size)
+    if len(head) != _HEADER.size:
+        raise ValueError("not a flight log")
+    magic, version, count = _HEADER.unpack(head)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a flight log")
+    fields = []
+    typecodes = []
+    for _ in range(count):
+        size = handle.read(1)
+        if not size:
+            raise ValueError("truncated flight log header")
+        entry = handle.read(size[0] + 1)
+        if len(entry) != size[0] + 1 or entry[-1:] not in (b"f", b"d"):
+            raise ValueError("truncated flight log header")
+        fields.append(entry[:-1].decode("utf-8"))
+        typecodes.append(entry[-1:].decode("ascii"))
+    return fields, typecodes
+
+
+def iter_chunks(path):
+    # Yields (fields, times, columns) one chunk at a time so arbitrarily long
+    # logs are never loaded whole. A chunk cut short by a crash or by a
+    # recording still in progress ends the iteration.
+    with open(path, "rb") as handle:
+        fields, typecodes = read_header(handle)
+        while True:
+            head = handle.read(_CHUNK.size)
+            if len(head) != _CHUNK.size:
+                return
+            magic, count, size = _CHUNK.unpack(head)
+            if magic != CHUNK_MAGIC:
+                return
+            payload = handle.read(size)
+            if len(payload) != size:
+                return
+            try:
+                raw = zlib.decompress(payload)
+            except zlib.error:
+                return
+            times = _unshuffle(raw[: 8 * count], "d", count)
+            columns = []
+            pos = 8 * count
+            for typecode in typecodes:
+                width = 8 if typecode == "d" else 4
+                columns.append(_unshuffle(raw[pos:pos + width * count], typecode, count))
+                pos += width * count
+            yield fields, times, columns
+
+
+def iter_samples(path):
+    for fields, times, columns in iter_chunks(path):
+        for index, timestamp in enumerate(times):
+            yield timestamp, {key: column[index] for key, column in zip(fields, columns)}
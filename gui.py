@@ -1,18 +1,50 @@
+import base64
+import bisect
 import ctypes
+import gzip
+import hashlib
+import http
 import json
+import struct
 import math
 import os
+import queue
 import socket
+import socketserver
 import subprocess
 import sys
 import threading
 import time
-import tkinter as tk
+import zlib
+from array import array
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from tkinter import colorchooser, messagebox, ttk
+from types import MappingProxyType
+from urllib.parse import parse_qs, urlsplit
+
+import export
+import flight_log
+import geo
 #©️ 2026 LUCA.NEX
 
 
+# tkinter is imported by _load_tk() only when the desktop UI starts, so headless
+# runs need neither the module nor a display; asyncio likewise only loads with
+# the asyncio server backend.
+tk = ttk = colorchooser = messagebox = None
+asyncio = None
+
+
+def _load_tk():
+    global tk, ttk, colorchooser, messagebox
+    import tkinter as tk
+    from tkinter import colorchooser, messagebox, ttk
+
+
+def _load_asyncio():
+    global asyncio
+    import asyncio
+
+
 def _load_port_value():
     path = os.path.join(os.getcwd(), "port.txt")
     try:
@@ -26,6 +58,107 @@ def _load_port_value():
     return 8989
 
 
+_DEFAULT_SETTINGS = {
+    "sample_rate_hz": 10.0,
+    "history_capacity": 72000,
+    "record_enabled": False,
+    "record_dir": "recordings",
+    "record_flush_seconds": 5.0,
+    "record_fsync_seconds": 30.0,
+    "server_backend": "threading",
+    "server_max_connections": 512,
+    "source": "auto",
+    "replay_file": "",
+    "replay_speed": 1.0,
+    "seat_id": "",
+    "fleet_port": 0,
+    "fleet_upstream": "",
+    "udp_target": "",
+    "udp_max_rate_hz": 60.0,
+    "udp_ttl": 1,
+    "ui_fps": 30,
+}
+
+
+def _load_settings():
+    settings = dict(_DEFAULT_SETTINGS)
+    path = os.path.join(os.getcwd(), "settings.json")
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if isinstance(data, dict):
+            settings.update(data)
+    except Exception:
+        pass
+    return settings
+
+
+def _clamp_rate(value, default=10.0):
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return default
+    if rate != rate:
+        return default
+    return min(max(rate, 1.0), 60.0)
+
+
+def _float_setting(settings, key, default):
+    try:
+        return float(settings.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _record_dir(settings):
+    return os.path.join(os.getcwd(), str(settings.get("record_dir") or "recordings"))
+
+
+def _record_options(settings):
+    if not settings.get("record_enabled"):
+        return None
+    try:
+        return {
+            "directory": _record_dir(settings),
+            "flush_seconds": float(settings.get("record_flush_seconds", 5.0)),
+            "fsync_seconds": float(settings.get("record_fsync_seconds", 30.0)),
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def _udp_options(settings):
+    # "host:port" in udp_target turns the UDP publisher on.
+    host, _sep, port = str(settings.get("udp_target") or "").rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        return None
+    if not host or not 1 <= port <= 65535:
+        return None
+    try:
+        return {
+            "host": host,
+            "port": port,
+            "max_rate_hz": float(settings.get("udp_max_rate_hz", 60.0)),
+            "ttl": int(settings.get("udp_ttl", 1)),
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def _fleet_upstream(settings):
+    # "host:port" of the aggregating server's fleet port, or None.
+    host, _sep, port = str(settings.get("fleet_upstream") or "").rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        return None
+    if not host or not 1 <= port <= 65535:
+        return None
+    return host, port
+
+
 def _is_windows():
     return os.name == "nt"
 
@@ -76,115 +209,2351 @@ def _ensure_firewall_rule(port):
     )
 
 
-class DataStore:
+_LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    # Updates are read-modify-write and take the lock: a lost increment or
+    # decrement would leave a gauge such as the open connection count off
+    # for good. Keep them out of per-read hot paths (DataStore.snapshot).
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1.0):
+        with self._lock:
+            values = self._values
+            values[label_values] = values.get(label_values, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            (self.name + _format_labels(self.labels, values), value) for values, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = float(value)
+
+    def dec(self, *label_values, amount=1.0):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [
+                (values, list(entry[0]), entry[1], entry[2])
+                for values, entry in self._values.items()
+            ]
+        lines = []
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket in zip(self._buckets + (math.inf,), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == math.inf else repr(bound)
+                labels = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append((self.name + "_bucket" + labels, cumulative))
+            labels = _format_labels(self.labels, values)
+            lines.append((self.name + "_sum" + labels, total))
+            lines.append((self.name + "_count" + labels, count))
+        return lines
+
+
+class MetricsRegistry:
+    # Process-wide metrics rendered in the Prometheus text format by /metrics.
     def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                if isinstance(value, float) and not value.is_integer():
+                    lines.append(f"{name} {value!r}")
+                else:
+                    lines.append(f"{name} {int(value)}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+METRICS = MetricsRegistry()
+_READ_SECONDS = METRICS.register(
+    Histogram("fde_reader_read_seconds", "Time spent in one reader read()", ("reader",))
+)
+_READ_FAILURES = METRICS.register(
+    Counter("fde_reader_failed_reads_total", "Reads that returned no sample", ("reader",))
+)
+_RECONNECTS = METRICS.register(
+    Counter("fde_reader_reconnects_total", "Failed reader connection attempts", ("reader",))
+)
+_SAMPLE_RATE = METRICS.register(Gauge("fde_sample_rate_hz", "Achieved collector sample rate"))
+_SAMPLE_JITTER = METRICS.register(
+    Gauge("fde_sample_jitter_ms", "Collector tick lateness (EWMA)")
+)
+_SAMPLES = METRICS.register(
+    Counter("fde_samples_total", "Samples taken by the collector", ("source",))
+)
+_STORE_UPDATES = METRICS.register(
+    Counter("fde_store_updates_total", "DataStore updates that changed at least one field")
+)
+_STORE_READS = METRICS.register(
+    Counter("fde_store_reads_total", "DataStore reads by clients, by kind", ("kind",))
+)
+_SERIALIZE_SECONDS = METRICS.register(
+    Histogram("fde_serialize_seconds", "Time spent serializing JSON", ("kind",))
+)
+_HTTP_REQUESTS = METRICS.register(
+    Counter("fde_http_requests_total", "HTTP requests by route and status", ("route", "status"))
+)
+_HTTP_SECONDS = METRICS.register(
+    Histogram("fde_http_request_seconds", "Time to build a response", ("route",))
+)
+_HTTP_BYTES = METRICS.register(
+    Counter("fde_http_response_bytes_total", "Response body bytes sent", ("route",))
+)
+_HTTP_CONNECTIONS = METRICS.register(
+    Gauge("fde_http_active_connections", "Open HTTP connections", ("backend",))
+)
+_STREAM_CLIENTS = METRICS.register(
+    Gauge("fde_stream_clients", "Connected push clients", ("route",))
+)
+
+_ROUTES = (
+    "/data", "/history", "/export", "/track", "/fleet/stream", "/fleet", "/stream", "/ws", "/metrics",
+    "/style.css", "/html-lang.json", "/interp.js", "/index.html",
+)
+
+
+def _stream_opened(route, status=200):
+    _HTTP_REQUESTS.inc(route, str(status))
+    _STREAM_CLIENTS.inc(route)
+
+
+def _stream_closed(route):
+    _STREAM_CLIENTS.dec(route)
+
+
+def _count_bytes(route, chunks):
+    try:
+        for data in chunks:
+            _HTTP_BYTES.inc(route, amount=len(data))
+            yield data
+    finally:
+        chunks.close()
+
+
+def _route(path):
+    # Collapses a request path to a fixed set of labels so arbitrary URLs
+    # cannot grow the metrics without bound.
+    path = path.split("?", 1)[0]
+    if path == "/":
+        return "/index.html"
+    for route in _ROUTES:
+        if path.startswith(route):
+            return route
+    return "other"
+
+
+# Built-in variable catalog, used when variables.json is missing or unreadable.
+# Tier rates are in Hz; a rate of 0 reads the tier on every sample. A field is
+# only published when it moves more than its deadband (in its own unit).
+_DEFAULT_TIERS = {"fast": 0, "medium": 5, "slow": 1}
+
+_DEFAULT_VARIABLES = [
+    {
+        "name": "altitude_ft",
+        "tier": "fast",
+        "deadband": 0.5,
+        "simconnect": {"var": "PLANE ALTITUDE", "unit": "feet"},
+        "fsuipc": {"offset": "0x0570", "type": "d", "scale": 1 / 65536},
+    },
+    {
+        "name": "heading_deg",
+        "tier": "fast",
+        "deadband": 0.05,
+        "simconnect": {"var": "PLANE HEADING DEGREES TRUE", "unit": "degrees"},
+        "fsuipc": {"offset": "0x0580", "type": "u", "scale": 360 / 65536},
+    },
+    {
+        "name": "airspeed_kt",
+        "tier": "fast",
+        "deadband": 0.05,
+        "simconnect": {"var": "AIRSPEED INDICATED", "unit": "knots"},
+        "fsuipc": {"offset": "0x02BC", "type": "u", "scale": 1 / 128},
+    },
+    {
+        "name": "vertical_speed_fpm",
+        "tier": "fast",
+        "deadband": 1.0,
+        "simconnect": {"var": "VERTICAL SPEED", "unit": "feet per minute"},
+        "fsuipc": {"offset": "0x02C8", "type": "d", "scale": 1 / 256},
+    },
+    {
+        "name": "latitude",
+        "tier": "fast",
+        "deadband": 1e-06,
+        "simconnect": {"var": "PLANE LATITUDE", "unit": "degrees"},
+        "fsuipc": {"offset": "0x0560", "type": "l", "scale": 90 / 2147483648},
+    },
+    {
+        "name": "longitude",
+        "tier": "fast",
+        "deadband": 1e-06,
+        "simconnect": {"var": "PLANE LONGITUDE", "unit": "degrees"},
+        "fsuipc": {"offset": "0x0568", "type": "l", "scale": 360 / 4294967296},
+    },
+    {
+        "name": "pitch_deg",
+        "tier": "fast",
+        "deadband": 0.05,
+        "simconnect": {"var": "PLANE PITCH DEGREES", "unit": "degrees"},
+        "fsuipc": {"offset": "0x0578", "type": "d", "scale": 360 / 65536},
+    },
+    {
+        "name": "bank_deg",
+        "tier": "fast",
+        "deadband": 0.05,
+        "simconnect": {"var": "PLANE BANK DEGREES", "unit": "degrees"},
+        "fsuipc": {"offset": "0x057C", "type": "d", "scale": 360 / 65536},
+    },
+    {
+        "name": "fuel_total_gal",
+        "tier": "slow",
+        "deadband": 0.01,
+        "simconnect": {"var": "FUEL TOTAL QUANTITY", "unit": "gallons"},
+        "fsuipc": {"offset": "0x0B7C", "type": "u", "scale": 1.0},
+    },
+]
+
+_FLIGHT_FIELDS = tuple(spec["name"] for spec in _DEFAULT_VARIABLES)
+
+
+def _parse_fsuipc_spec(spec):
+    offset = spec["offset"]
+    divisor = spec.get("divisor")
+    parsed = {
+        "offset": offset if isinstance(offset, int) else int(str(offset), 16),
+        "type": spec.get("type", "d"),
+        "scale": float(spec.get("scale", 1.0)),
+        "offset_add": float(spec.get("offset_add", 0.0)),
+        "divisor": float(divisor) if divisor else None,
+    }
+    for name in ("scale", "offset_add", "divisor"):
+        value = parsed[name]
+        if value is not None and not math.isfinite(value):
+            raise ValueError(f"{name} must be finite")
+    return parsed
+
+
+class VariableCatalog:
+    # The single description of every tracked variable: its SimConnect simvar
+    # and unit, its FSUIPC offset, its rate tier and whether it is kept in
+    # history. Reader subscriptions and the DataStore schema are generated
+    # from it, so adding a variable is a variables.json edit.
+    def __init__(self, variables=None, tiers=None):
+        if variables is None:
+            variables = _DEFAULT_VARIABLES
+        self.tiers = []
+        for name, rate in (tiers or _DEFAULT_TIERS).items():
+            try:
+                self.tiers.append((str(name), max(float(rate), 0.0)))
+            except (TypeError, ValueError):
+                continue
+        if not self.tiers:
+            self.tiers = [("fast", 0.0)]
+        tier_index = {name: index for index, (name, _rate) in enumerate(self.tiers)}
+        self._entries = []
+        seen = set()
+        for spec in variables:
+            try:
+                key = spec["name"]
+                if not isinstance(key, str) or not key.isidentifier() or key in seen:
+                    continue
+                simconnect = spec.get("simconnect")
+                if simconnect:
+                    simconnect = (str(simconnect["var"]), str(simconnect.get("unit", "number")))
+                fsuipc = spec.get("fsuipc")
+                if fsuipc:
+                    fsuipc = _parse_fsuipc_spec(fsuipc)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            try:
+                deadband = max(float(spec.get("deadband", 0.0)), 0.0)
+            except (TypeError, ValueError):
+                deadband = 0.0
+            seen.add(key)
+            self._entries.append(
+                {
+                    "name": key,
+                    "tier": tier_index.get(spec.get("tier"), 0),
+                    "simconnect": simconnect or None,
+                    "fsuipc": fsuipc or None,
+                    "history": bool(spec.get("history", True)),
+                    "deadband": deadband,
+                }
+            )
+
+    @property
+    def fields(self):
+        return tuple(entry["name"] for entry in self._entries)
+
+    @property
+    def history_fields(self):
+        return tuple(entry["name"] for entry in self._entries if entry["history"])
+
+    def field_tiers(self):
+        return {entry["name"]: entry["tier"] for entry in self._entries}
+
+    def deadbands(self):
+        return {entry["name"]: entry["deadband"] for entry in self._entries if entry["deadband"]}
+
+    def simconnect_groups(self):
+        # [(tier rate, [(key, simvar, unit), ...]), ...], one per non-empty tier.
+        return self._groups("simconnect", lambda entry: (entry["name"],) + entry["simconnect"])
+
+    def fsuipc_groups(self):
+        # [(tier rate, [(key, spec), ...]), ...], one per non-empty tier.
+        return self._groups("fsuipc", lambda entry: (entry["name"], entry["fsuipc"]))
+
+    def override_fsuipc(self, offsets):
+        # Applies a legacy fsuipc_offsets.json ({key: spec}); unknown keys are
+        # added as FSUIPC-only variables in the fastest tier.
+        entries = {entry["name"]: entry for entry in self._entries}
+        for key, spec in offsets.items():
+            try:
+                fsuipc = _parse_fsuipc_spec(spec)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            if key in entries:
+                entries[key]["fsuipc"] = fsuipc
+            elif isinstance(key, str) and key.isidentifier():
+                entry = {
+                    "name": key,
+                    "tier": 0,
+                    "simconnect": None,
+                    "fsuipc": fsuipc,
+                    "history": True,
+                    "deadband": 0.0,
+                }
+                self._entries.append(entry)
+                entries[key] = entry
+
+    def _groups(self, reader, build):
+        groups = []
+        for index, (_name, rate) in enumerate(self.tiers):
+            members = [
+                build(entry)
+                for entry in self._entries
+                if entry["tier"] == index and entry[reader]
+            ]
+            if members:
+                groups.append((rate, members))
+        return groups
+
+
+def _load_catalog():
+    path = os.path.join(os.getcwd(), "variables.json")
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        catalog = VariableCatalog(data.get("variables"), data.get("tiers"))
+    except Exception:
+        catalog = VariableCatalog()
+    # fsuipc_offsets.json predates the catalog and still wins when present.
+    legacy = os.path.join(os.getcwd(), "fsuipc_offsets.json")
+    try:
+        with open(legacy, "r", encoding="utf-8") as handle:
+            offsets = json.load(handle)
+        if isinstance(offsets, dict):
+            catalog.override_fsuipc(offsets)
+    except Exception:
+        pass
+    return catalog
+
+
+class _TierClock:
+    # Decides which rate tiers are due on a read. Each tier keeps its own
+    # deadline grid so a 5 Hz tier read from a 10 Hz loop stays at 5 Hz.
+    def __init__(self, rates):
+        self._periods = [1.0 / rate if rate > 0 else 0.0 for rate in rates]
+        self._due = [0.0] * len(rates)
+
+    def reset(self):
+        self._due = [0.0] * len(self._periods)
+
+    def due(self, now):
+        ready = []
+        for index, period in enumerate(self._periods):
+            if now < self._due[index]:
+                continue
+            ready.append(index)
+            deadline = self._due[index] + period
+            self._due[index] = deadline if deadline > now else now + period
+        return ready
+
+
+class FlightHistory:
+    def __init__(self, fields, capacity=72000):
         self._lock = threading.Lock()
-        self._data = {
-            "altitude_ft": 0.0,
-            "heading_deg": 0.0,
-            "airspeed_kt": 0.0,
-            "vertical_speed_fpm": 0.0,
-            "latitude": 0.0,
-            "longitude": 0.0,
-            "pitch_deg": 0.0,
-            "bank_deg": 0.0,
-            "fuel_total_gal": 0.0,
-            "last_update": time.time(),
-            "source": "idle",
-        }
+        self._fields = list(fields)
+        try:
+            capacity = int(capacity)
+        except (TypeError, ValueError):
+            capacity = 72000
+        self._capacity = max(capacity, 1)
+        # Every column is allocated up front; once full, the oldest sample is
+        # overwritten in place so memory stays flat however long the session.
+        empty = bytes(8 * self._capacity)
+        self._times = array("d", empty)
+        self._columns = {key: array("d", empty) for key in self._fields}
+        self._start = 0
+        self._count = 0
+        # Samples ever appended; the oldest one kept is number
+        # _appended - _count, which lets a reader resume by position.
+        self._appended = 0
+
+    @property
+    def fields(self):
+        return list(self._fields)
+
+    def layout(self, fields=None):
+        return [(key, "d") for key in self._keys(fields)]
+
+    def append(self, timestamp, data):
+        with self._lock:
+            if self._count < self._capacity:
+                index = (self._start + self._count) % self._capacity
+                self._count += 1
+            else:
+                index = self._start
+                self._start = (self._start + 1) % self._capacity
+            self._appended += 1
+            self._times[index] = timestamp
+            for key, column in self._columns.items():
+                value = data.get(key)
+                column[index] = value if isinstance(value, float) else math.nan
+
+    def query(self, since=None, fields=None, limit=None):
+        keys = self._keys(fields)
+        with self._lock:
+            first = 0 if since is None else self._bisect_after(since)
+            times, columns = self._copy(keys, first, limit)
+        return keys, times, columns
+
+    def iter_chunks(self, since=None, fields=None, size=4096):
+        # Yields (fields, times, columns) like flight_log.iter_chunks, holding
+        # the lock for one chunk at a time so exports never stall the collector.
+        # Each chunk resumes at the sample after the last one sent (not at its
+        # timestamp, which later samples may share); samples overwritten while
+        # an export is running are skipped.
+        keys = self._keys(fields)
+        position = None
+        while True:
+            with self._lock:
+                oldest = self._appended - self._count
+                if position is None:
+                    first = 0 if since is None else self._bisect_after(since)
+                else:
+                    first = max(position - oldest, 0)
+                times, columns = self._copy(keys, first, size)
+                position = oldest + first + len(times)
+            if not times:
+                return
+            yield keys, times, columns
+            if len(times) < size:
+                return
+
+    def _keys(self, fields):
+        return [key for key in (fields or self._fields) if key in self._columns]
+
+    def _copy(self, keys, first, limit):
+        count = self._count - first
+        if limit is not None:
+            count = min(count, limit)
+        times = array("d")
+        columns = [array("d") for _key in keys]
+        for lo, hi in self._ranges(first, count):
+            times.extend(self._times[lo:hi])
+            for column, key in zip(columns, keys):
+                column.extend(self._columns[key][lo:hi])
+        return times, columns
+
+    def _bisect_after(self, since):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[(self._start + mid) % self._capacity] <= since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _ranges(self, first, count):
+        if count <= 0:
+            return []
+        lo = (self._start + first) % self._capacity
+        hi = lo + count
+        if hi <= self._capacity:
+            return [(lo, hi)]
+        return [(lo, self._capacity), (0, hi - self._capacity)]
+
+
+# Track simplification levels, each one tolerance (meters) coarser than the
+# last; a map at a given zoom gets the coarsest level whose tolerance is still
+# under one screen pixel there.
+_TRACK_TOLERANCES_M = (2.0, 8.0, 32.0, 128.0, 512.0, 2048.0, 8192.0)
+_TRACK_LEVEL_CAPACITY = 8000
+_TRACK_MAX_WINDOW = 256
+_METERS_PER_DEGREE = 111194.93
+_MERCATOR_M_PER_PIXEL = 156543.03392
+_TRACK_MAX_ZOOM = 30.0
+
+
+def _segment_distance_m(point, start, end):
+    # Distance from `point` to the segment start-end on a local equirectangular
+    # plane around `start`; plenty accurate over a few hundred samples.
+    scale = math.cos(math.radians(start[1])) * _METERS_PER_DEGREE
+    ex = ((end[2] - start[2] + 540.0) % 360.0 - 180.0) * scale
+    ey = (end[1] - start[1]) * _METERS_PER_DEGREE
+    px = ((point[2] - start[2] + 540.0) % 360.0 - 180.0) * scale
+    py = (point[1] - start[1]) * _METERS_PER_DEGREE
+    length = ex * ex + ey * ey
+    if length > 0.0:
+        ratio = max(0.0, min(1.0, (px * ex + py * ey) / length))
+        px -= ratio * ex
+        py -= ratio * ey
+    return math.hypot(px, py)
+
+
+class _TrackLevel:
+    # Opening-window line simplification: points are held back while every one
+    # of them stays within `tolerance` of the segment from the last kept vertex
+    # to the newest point. Kept vertices are final, so clients can fetch only
+    # the vertices after the last one they have.
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.vertices = []
+        self.times = []
+        self.truncated = False
+        self._window = []
+
+    def add(self, point):
+        # Returns the vertex kept because of `point`, or None.
+        if not self.vertices:
+            self._keep(point)
+            return point
+        window = self._window
+        window.append(point)
+        if len(window) < 2:
+            return None
+        if len(window) <= _TRACK_MAX_WINDOW:
+            start = self.vertices[-1]
+            tolerance = self.tolerance
+            if all(_segment_distance_m(item, start, point) <= tolerance for item in window[:-1]):
+                return None
+        kept = window[-2]
+        self._keep(kept)
+        self._window = [point]
+        return kept
+
+    def _keep(self, point):
+        self.vertices.append(point)
+        self.times.append(point[0])
+        if len(self.vertices) > _TRACK_LEVEL_CAPACITY:
+            # The oldest part is still covered by the coarser levels.
+            drop = _TRACK_LEVEL_CAPACITY // 4
+            del self.vertices[:drop]
+            del self.times[:drop]
+            self.truncated = True
+
+
+class FlightTrack:
+    # The flown path at several levels of detail, simplified incrementally as
+    # samples arrive. Each level is fed the vertices the finer one keeps, so
+    # coarse levels cost next to nothing, and every level holds a bounded
+    # number of vertices however long the flight.
+    def __init__(self, tolerances=_TRACK_TOLERANCES_M):
+        self._lock = threading.Lock()
+        self._levels = [_TrackLevel(tolerance) for tolerance in tolerances]
+        self._last = None
+        self.version = 0
+
+    def append(self, timestamp, latitude, longitude, altitude):
+        if not isinstance(latitude, float) or not isinstance(longitude, float):
+            return
+        if latitude != latitude or longitude != longitude:
+            return
+        if latitude == 0.0 and longitude == 0.0:
+            # The readers report 0/0 until the sim has a position.
+            return
+        point = (timestamp, latitude, longitude, altitude if isinstance(altitude, float) else None)
+        with self._lock:
+            self._last = point
+            self.version += 1
+            for level in self._levels:
+                point = level.add(point)
+                if point is None:
+                    break
+
+    def level_for_zoom(self, zoom, latitude=0.0):
+        # Coarsest level whose tolerance is below one pixel at `zoom`.
+        zoom = min(max(zoom, 0.0), _TRACK_MAX_ZOOM)
+        meters_per_pixel = (
+            _MERCATOR_M_PER_PIXEL * math.cos(math.radians(latitude)) / (2.0 ** zoom)
+        )
+        index = 0
+        for candidate, level in enumerate(self._levels):
+            if level.tolerance <= meters_per_pixel:
+                index = candidate
+        return index
+
+    def query(self, zoom=None, bbox=None, since=None):
+        # Returns (version, tolerance_m, segments). Segments are runs of
+        # consecutive points whose pieces overlap `bbox` (west, south, east,
+        # north); without a bbox the whole track is one segment. The newest
+        # sample is appended so the line always reaches the aircraft.
+        with self._lock:
+            version = self.version
+            last = self._last
+            if last is None:
+                return version, self._levels[0].tolerance, []
+            index = 0 if zoom is None else self.level_for_zoom(zoom, last[1])
+            points = self._points(index, since)
+        if (since is None or last[0] > since) and (not points or points[-1][0] < last[0]):
+            points.append(last)
+        tolerance = self._levels[index].tolerance
+        if bbox is None:
+            return version, tolerance, [points] if points else []
+        return version, tolerance, _clip_track(points, bbox)
+
+    def _points(self, index, since):
+        # The chosen level, with the part it has already dropped filled in
+        # from coarser levels.
+        points = []
+        cutoff = math.inf
+        for level in self._levels[index:]:
+            if level.times and level.times[0] < cutoff:
+                first = 0 if since is None else bisect.bisect_right(level.times, since)
+                end = bisect.bisect_left(level.times, cutoff)
+                if first < end:
+                    points = level.vertices[first:end] + points
+                cutoff = level.times[0]
+            if not level.truncated:
+                break
+        return points
+
+
+def _span_overlaps(low, high, west, east):
+    # A bbox with west > east crosses the antimeridian: it covers west..180
+    # and -180..east.
+    if west <= east:
+        return high >= west and low <= east
+    return high >= west or low <= east
+
+
+def _longitudes_overlap(first, second, west, east):
+    # Longitudes of a track piece (the short way round) against the bbox.
+    low, high = min(first, second), max(first, second)
+    if high - low > 180.0:
+        # The piece crosses the antimeridian: it covers high..180, -180..low.
+        return _span_overlaps(high, 180.0, west, east) or _span_overlaps(-180.0, low, west, east)
+    return _span_overlaps(low, high, west, east)
+
+
+def _clip_track(points, bbox):
+    west, south, east, north = bbox
+    segments = []
+    current = None
+    for start, end in zip(points, points[1:]):
+        if (
+            not _longitudes_overlap(start[2], end[2], west, east)
+            or max(start[1], end[1]) < south
+            or min(start[1], end[1]) > north
+        ):
+            current = None
+            continue
+        if current is None:
+            current = [start]
+            segments.append(current)
+        current.append(end)
+    if not segments and len(points) == 1:
+        point = points[0]
+        if _longitudes_overlap(point[2], point[2], west, east) and south <= point[1] <= north:
+            segments.append([point])
+    return segments
+
+
+# Versions restart at 0 with every process, so validators and ?since= tokens
+# handed to clients also carry this boot id; a token from an earlier run can
+# then never be mistaken for a state of this one.
+_BOOT_ID = os.urandom(4).hex()
+# Keys every DataStore sets for itself; they are never copied between stores
+# (a remote seat's version, clock and boot id mean nothing here).
+_STORE_META = ("version", "last_update", "epoch")
+
+
+def _version_token(version):
+    return f"{_BOOT_ID}-{version}"
+
+
+def _parse_version_token(token):
+    # The store version for a token of this process, None for a token from
+    # another run (or a bare number from an older client). Raises ValueError
+    # when the version part is not a number.
+    epoch, sep, version = token.rpartition("-")
+    if not sep:
+        int(token)
+        return None
+    version = int(version)
+    if epoch != _BOOT_ID:
+        return None
+    return version
+
+
+class StoreSnapshot:
+    # One published state of a DataStore, never mutated once built: `data` and
+    # `field_versions` are read-only views and `payload` is the JSON for
+    # `data`, serialized once by the writer. Readers share it freely.
+    __slots__ = ("version", "data", "field_versions", "payload")
+
+    def __init__(self, version, data, field_versions):
+        self.version = version
+        self.data = MappingProxyType(data)
+        self.field_versions = MappingProxyType(field_versions)
+        started = time.perf_counter()
+        self.payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        _SERIALIZE_SECONDS.observe(time.perf_counter() - started, "store")
+
+
+class DataStore:
+    # Copy-on-write: update() builds a new StoreSnapshot and swaps the single
+    # `_current` reference, which is atomic under the GIL. Readers only load
+    # that reference, so they never take the writer's lock, never copy and
+    # never serialize. The lock serializes writers and backs the condition
+    # that long-poll and stream waiters sleep on.
+    def __init__(self, fields=_FLIGHT_FIELDS, history_capacity=72000, history_fields=None):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._fields = tuple(fields)
+        self._history_fields = tuple(
+            self._fields if history_fields is None else history_fields
+        )
+        self._history_set = frozenset(self._history_fields)
+        data = {key: 0.0 for key in self._fields}
+        data.update(
+            {
+                "sample_rate_hz": 0.0,
+                "sample_jitter_ms": 0.0,
+                "last_update": time.time(),
+                "source": "idle",
+                "version": 0,
+                "epoch": _BOOT_ID,
+            }
+        )
+        self._current = StoreSnapshot(0, data, {key: 0 for key in data})
+        self._listeners = ()
+        self.history = FlightHistory(self._history_fields, history_capacity)
+        self.track = FlightTrack()
 
     def update(self, new_data):
         with self._lock:
-            self._data.update(new_data)
-            self._data["last_update"] = time.time()
+            current = self._current
+            old = current.data
+            changed = [key for key, value in new_data.items() if old.get(key) != value]
+            if not changed:
+                # Nothing moved: no new version, no wakeups, no re-serialization.
+                return
+            version = current.version + 1
+            data = dict(old)
+            field_versions = dict(current.field_versions)
+            for key in changed:
+                data[key] = new_data[key]
+                field_versions[key] = version
+            now = time.time()
+            data["last_update"] = now
+            data["version"] = version
+            field_versions["last_update"] = version
+            field_versions["version"] = version
+            self._current = StoreSnapshot(version, data, field_versions)
+            _STORE_UPDATES.inc()
+            if any(key in self._history_set for key in changed):
+                self.history.append(now, data)
+            if "latitude" in changed or "longitude" in changed:
+                self.track.append(
+                    now, data.get("latitude"), data.get("longitude"), data.get("altitude_ft")
+                )
+            self._changed.notify_all()
+            listeners = self._listeners
+        for callback in listeners:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    @property
+    def fields(self):
+        return self._fields
+
+    @property
+    def history_fields(self):
+        return self._history_fields
+
+    def current(self):
+        return self._current
 
     def snapshot(self):
+        # A read-only mapping; callers that need to modify it copy it.
+        return self._current.data
+
+    def payload(self):
+        current = self._current
+        return current.version, current.payload
+
+    def changes_since(self, version):
+        # Fields written after `version`. A version from the future (for example
+        # a client that outlived a server restart) gets the full snapshot.
+        current = self._current
+        if version > current.version:
+            return current.version, dict(current.data)
+        changes = {
+            key: current.data[key]
+            for key, changed in current.field_versions.items()
+            if changed > version
+        }
+        return current.version, changes
+
+    def add_listener(self, callback):
+        with self._lock:
+            self._listeners = self._listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item != callback)
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def wait_for_version(self, version, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self._current.version != version, timeout)
+        return self._current.version
+
+    def wait_for_update(self, version, timeout):
+        # Blocks until a sample newer than `version` is recorded; every waiter
+        # shares the same serialized bytes for that sample.
+        with self._changed:
+            self._changed.wait_for(lambda: self._current.version != version, timeout)
+        return self.payload()
+
+
+class FleetStore:
+    # Several seats (one aircraft each) behind one server. Every seat is its
+    # own DataStore: local collectors register theirs with add(), remote seats
+    # get one on first contact through update(). A fleet version is bumped on
+    # every seat change and each seat remembers the fleet version of its last
+    # change, so the fleet stream can send only the seats that moved. Remote
+    # seats are capped at `max_seats` and can never replace a local one.
+    def __init__(
+        self, fields=_FLIGHT_FIELDS, history_capacity=3000, history_fields=None, max_seats=64
+    ):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._fields = tuple(fields)
+        self._history_fields = history_fields
+        self._history_capacity = history_capacity
+        self._max_seats = max_seats
+        self._seats = {}
+        self._remote = set()
+        self._seat_versions = {}
+        self._version = 0
+        self._payload = None
+        self._listeners = ()
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def fields(self):
+        return self._fields
+
+    def seats(self):
+        with self._lock:
+            return list(self._seats)
+
+    def seat(self, seat):
+        return self._seats.get(seat)
+
+    def add(self, seat, store):
+        with self._lock:
+            if seat in self._seats:
+                return self._seats[seat]
+            self._seats[seat] = store
+        store.add_listener(lambda: self._touch(seat))
+        self._touch(seat)
+        return store
+
+    def update(self, seat, data):
+        # Applies a remote seat's changes, creating the seat on first contact.
+        # Returns False for a local seat's id or a new seat past max_seats.
+        store = self._seats.get(seat)
+        if store is None:
+            if len(self._remote) >= self._max_seats:
+                return False
+            store = DataStore(
+                fields=self._fields,
+                history_capacity=self._history_capacity,
+                history_fields=self._history_fields,
+            )
+            with self._lock:
+                existing = self._seats.get(seat)
+                added = existing is None and len(self._remote) < self._max_seats
+                if added:
+                    self._seats[seat] = store
+                    self._remote.add(seat)
+            if added:
+                store.add_listener(lambda: self._touch(seat))
+                self._touch(seat)
+            elif existing is None:
+                return False
+            else:
+                store = existing
+        if seat not in self._remote:
+            return False
+        store.update(data)
+        return True
+
+    def add_listener(self, callback):
+        with self._lock:
+            self._listeners = self._listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners = tuple(item for item in self._listeners if item != callback)
+
+    def payload(self):
+        with self._lock:
+            version = self._version
+            payload = self._payload
+            if payload is None or payload[0] != version:
+                seats = list(self._seats.items())
+            else:
+                return payload
+        payload = (version, self._pack(version, seats))
+        with self._lock:
+            if self._version == version:
+                self._payload = payload
+        return payload
+
+    def payload_since(self, version):
+        # Same shape as payload(), limited to seats changed after `version`.
+        with self._lock:
+            if version > self._version:
+                version = -1
+            seats = [
+                (seat, self._seats[seat])
+                for seat, changed in self._seat_versions.items()
+                if changed > version
+            ]
+            latest = self._version
+        return latest, self._pack(latest, seats)
+
+    def wait_for_update(self, version, timeout):
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout)
+        return self.payload_since(version)
+
+    def _touch(self, seat):
+        with self._lock:
+            self._version += 1
+            self._seat_versions[seat] = self._version
+            self._changed.notify_all()
+            listeners = self._listeners
+        for callback in listeners:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def _pack(self, version, seats):
+        # Each seat's snapshot is already serialized by its DataStore; the fleet
+        # document only stitches those bytes together.
+        started = time.perf_counter()
+        parts = [
+            json.dumps(seat, ensure_ascii=False).encode("utf-8") + b":" + store.payload()[1]
+            for seat, store in seats
+        ]
+        payload = b'{"version":%d,"seats":{' % version + b",".join(parts) + b"}}"
+        _SERIALIZE_SECONDS.observe(time.perf_counter() - started, "fleet")
+        return payload
+
+
+class StaticAssets:
+    def __init__(self, directory, files, check_interval=1.0):
+        self._directory = directory
+        self._files = dict(files)
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._checked = {}
+        try:
+            import brotli
+
+            self._brotli = brotli
+        except Exception:
+            self._brotli = None
+
+    def load(self):
+        for name in self._files:
+            self._refresh(name)
+
+    def get(self, name):
+        if name not in self._files:
+            return None
+        now = time.monotonic()
+        if now - self._checked.get(name, 0.0) >= self._check_interval:
+            self._refresh(name)
+        return self._entries.get(name)
+
+    def _refresh(self, name):
+        # The mtime check is throttled per asset, so steady-state requests are
+        # served from memory without touching the filesystem.
+        path = os.path.join(self._directory, name)
+        self._checked[name] = time.monotonic()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._entries.pop(name, None)
+            return
+        entry = self._entries.get(name)
+        if entry is not None and entry["mtime"] == mtime:
+            return
+        try:
+            with open(path, "rb") as handle:
+                body = handle.read()
+        except OSError:
+            return
+        content_type, cache_control = self._files[name]
+        encoded = {"identity": body}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            encoded["gzip"] = compressed
+        if self._brotli is not None:
+            try:
+                compressed = self._brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    encoded["br"] = compressed
+            except Exception:
+                pass
+        # Strong validators must differ per content-coding, so each encoded
+        # body gets its own suffix on the content hash.
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        suffixes = {"identity": "", "gzip": "-gz", "br": "-br"}
+        entry = {
+            "mtime": mtime,
+            "etags": {encoding: f'"{digest}{suffixes[encoding]}"' for encoding in encoded},
+            "content_type": content_type,
+            "cache_control": cache_control,
+            "bodies": encoded,
+        }
+        with self._lock:
+            self._entries[name] = entry
+
+
+def _pick_encoding(header, available):
+    if not header:
+        return "identity"
+    accepted = {}
+    for item in header.split(","):
+        token, _sep, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    candidates = [item.strip() for item in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _pack_history(keys, times, columns):
+    # Layout (little-endian): u32 sample count, u16 field count, then each field
+    # name as u8 length + utf-8 bytes, then the float64 time column followed by
+    # one float64 column per field. Missing values are NaN.
+    names = [key.encode("utf-8") for key in keys]
+    parts = [struct.pack("<IH", len(times), len(names))]
+    for name in names:
+        parts.append(struct.pack("<B", len(name)) + name)
+    for column in [times] + list(columns):
+        if sys.byteorder != "little":
+            column = array("d", column)
+            column.byteswap()
+        parts.append(column.tobytes())
+    return b"".join(parts)
+
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT = 0x1
+_WS_BINARY = 0x2
+_WS_CLOSE = 0x8
+_WS_PING = 0x9
+_WS_PONG = 0xA
+_WS_MAX_MESSAGE = 65536
+
+
+def _ws_accept(key):
+    digest = hashlib.sha1((key.strip() + _WS_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def _ws_frame(opcode, payload):
+    size = len(payload)
+    if size < 126:
+        head = struct.pack("!BB", 0x80 | opcode, size)
+    elif size < 65536:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, size)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, size)
+    return head + payload
+
+
+def _ws_unmask(payload, mask):
+    if not payload:
+        return payload
+    size = len(payload)
+    key = (mask * (size // 4 + 1))[:size]
+    value = int.from_bytes(payload, "little") ^ int.from_bytes(key, "little")
+    return value.to_bytes(size, "little")
+
+
+def _ws_read_frame(read_exact):
+    # Returns (fin, opcode, payload) for one client frame; client frames are
+    # always masked.
+    first, second = read_exact(2)
+    size = second & 0x7F
+    if size == 126:
+        size = struct.unpack("!H", read_exact(2))[0]
+    elif size == 127:
+        size = struct.unpack("!Q", read_exact(8))[0]
+    if size > _WS_MAX_MESSAGE or not second & 0x80:
+        raise ValueError("unsupported websocket frame")
+    mask = read_exact(4)
+    return bool(first & 0x80), first & 0x0F, _ws_unmask(read_exact(size), mask)
+
+
+class WebSocketSession:
+    # Per-client subscription for /ws. The client sends a JSON text message
+    # such as {"fields": ["latitude", "longitude"], "max_rate": 5,
+    # "precision": "f32"}; the server answers with a JSON schema message and
+    # then pushes binary sample frames (little-endian):
+    #   u8 kind (1 = sample), u8 flags (bit 0: float64 values, else float32),
+    #   u32 store version, f64 last_update, field bitmap of ceil(n / 8) bytes
+    #   (bit i, LSB first, set = i-th subscribed field present), then the
+    #   values of the present fields in subscription order.
+    # Only fields whose value changed since the previous frame are present.
+    def __init__(self, max_rate=60.0, fields=_FLIGHT_FIELDS):
+        self._lock = threading.Lock()
+        self._max_rate = max_rate
+        self._default_fields = tuple(fields)
+        self._fields = None
+        self._interval = 0.0
+        self._format = "f"
+        self._last = {}
+        self.pending = False
+
+    @property
+    def subscribed(self):
+        return self._fields is not None
+
+    @property
+    def interval(self):
+        return self._interval
+
+    def subscribe(self, message, snapshot):
+        try:
+            request = json.loads(message)
+            if not isinstance(request, dict):
+                raise ValueError("subscription must be an object")
+            numeric = [
+                key
+                for key, value in snapshot.items()
+                if isinstance(value, float) and key != "last_update"
+            ]
+            fields = request.get("fields")
+            if fields is None:
+                fields = list(self._default_fields)
+            elif not isinstance(fields, list) or not all(
+                isinstance(key, str) for key in fields
+            ):
+                raise ValueError("fields must be a list of field names")
+            fields = [key for key in fields or self._default_fields if key in numeric]
+            rate = float(request.get("max_rate", self._max_rate))
+            if not rate > 0:
+                raise ValueError("max_rate must be positive")
+            precision = "f64" if request.get("precision") == "f64" else "f32"
+        except (TypeError, ValueError) as exc:
+            return json.dumps({"type": "error", "error": str(exc)}).encode("utf-8")
         with self._lock:
-            return dict(self._data)
+            self._fields = fields
+            self._interval = 1.0 / min(rate, self._max_rate)
+            self._format = "d" if precision == "f64" else "f"
+            self._last = {}
+            self.pending = True
+        schema = {
+            "type": "schema",
+            "fields": fields,
+            "precision": precision,
+            "max_rate": 1.0 / self._interval,
+        }
+        return json.dumps(schema).encode("utf-8")
+
+    def encode(self, snapshot, version):
+        with self._lock:
+            self.pending = False
+            if not self._fields:
+                return None
+            bitmap = bytearray((len(self._fields) + 7) // 8)
+            values = []
+            for index, key in enumerate(self._fields):
+                value = snapshot.get(key)
+                if not isinstance(value, float) or self._last.get(key) == value:
+                    continue
+                self._last[key] = value
+                bitmap[index // 8] |= 1 << (index % 8)
+                values.append(value)
+            if not values:
+                return None
+            flags = 1 if self._format == "d" else 0
+            head = struct.pack(
+                "<BBId", 1, flags, version & 0xFFFFFFFF, snapshot.get("last_update", 0.0)
+            )
+            body = struct.pack(f"<{len(values)}{self._format}", *values)
+        return head + bytes(bitmap) + body
+
+
+_SSE_HEADERS = {
+    "Content-Type": "text/event-stream; charset=utf-8",
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+class _ThreadingHTTPServer(ThreadingHTTPServer):
+    # socketserver's default listen backlog of 5 refuses connections as soon as
+    # a few dozen clients connect at once.
+    request_queue_size = 128
 
 
 class DataServer:
-    def __init__(self, host, port, data_provider, static_dir):
+    def __init__(
+        self,
+        host,
+        port,
+        store,
+        static_dir,
+        backend="threading",
+        max_connections=512,
+        fleet=None,
+        record_dir=None,
+    ):
         self._host = host
         self._port = port
-        self._data_provider = data_provider
+        self._store = store
+        self._fleet = fleet
+        self._record_dir = record_dir
         self._static_dir = static_dir
+        self._backend = backend
+        self._max_connections = max_connections
         self._server = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._assets = StaticAssets(
+            static_dir,
+            {
+                "index.html": ("text/html; charset=utf-8", "no-cache"),
+                "style.css": ("text/css; charset=utf-8", "public, max-age=300"),
+                "html-lang.json": ("application/json; charset=utf-8", "public, max-age=300"),
+                "interp.js": ("text/javascript; charset=utf-8", "public, max-age=300"),
+            },
+        )
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def fleet(self):
+        return self._fleet
 
     def start(self):
         if self._server:
             return
-        handler = self._make_handler()
-        self._server = ThreadingHTTPServer((self._host, self._port), handler)
+        self._stopping.clear()
+        self._assets.load()
+        if self._backend == "asyncio":
+            self._server = AsyncHTTPServer(
+                self, self._host, self._port, self._max_connections
+            )
+        else:
+            self._server = _ThreadingHTTPServer(
+                (self._host, self._port), self._make_handler()
+            )
+        self._ready.set()
         self._server.serve_forever()
 
+    def wait_ready(self, timeout=None):
+        # True once the server is accepting connections.
+        if not self._ready.wait(timeout):
+            return False
+        server = self._server
+        if isinstance(server, AsyncHTTPServer):
+            return server.wait_ready(timeout)
+        return server is not None
+
     def stop(self):
         if not self._server:
             return
+        self._stopping.set()
         self._server.shutdown()
         self._server.server_close()
         self._server = None
 
+    def is_stream(self, path):
+        return path.startswith("/stream")
+
+    def is_websocket(self, path):
+        return path == "/ws" or path.startswith("/ws?")
+
+    def is_fleet_stream(self, path):
+        if self._fleet is None:
+            return False
+        return path == "/fleet/stream" or path.startswith("/fleet/stream?")
+
+    def is_slow(self, path):
+        # Routes whose response can take a while to build (whole-history JSON,
+        # session log I/O, track clipping); event-loop backends run these on a
+        # worker thread.
+        return _route(path) in ("/history", "/export", "/track")
+
+    def respond(self, path, headers):
+        # Backend-neutral routing: returns (status, headers, body) for every
+        # route except the long-lived ones, which each backend drives itself.
+        # `body` is bytes, or a generator of bytes (exports) that the backend
+        # sends with chunked transfer encoding as it is produced.
+        started = time.perf_counter()
+        status, response_headers, body = self._dispatch(path, headers)
+        route = _route(path)
+        _HTTP_SECONDS.observe(time.perf_counter() - started, route)
+        _HTTP_REQUESTS.inc(route, str(status))
+        if isinstance(body, bytes):
+            _HTTP_BYTES.inc(route, amount=len(body))
+        else:
+            body = _count_bytes(route, body)
+        return status, response_headers, body
+
+    def _dispatch(self, path, headers):
+        if path == "/" or path.startswith("/index.html"):
+            return self._file_response("index.html", headers)
+        if path.startswith("/style.css"):
+            return self._file_response("style.css", headers)
+        if path.startswith("/html-lang.json"):
+            return self._file_response("html-lang.json", headers)
+        if path.startswith("/interp.js"):
+            return self._file_response("interp.js", headers)
+        if path.startswith("/history"):
+            return self._history_response(path)
+        if path == "/export" or path.startswith("/export?"):
+            return self._export_response(path)
+        if path == "/track" or path.startswith("/track?"):
+            return self._track_response(path, headers)
+        if path.startswith("/data"):
+            return self._data_response(path, headers)
+        if path == "/fleet" or path.startswith("/fleet?"):
+            return self._fleet_response(headers)
+        if path == "/metrics" or path.startswith("/metrics?"):
+            return (
+                200,
+                {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+                METRICS.render(),
+            )
+        return 404, {}, b""
+
+    def _seat_store(self, query):
+        # The local store, or with ?seat= one seat of the fleet (None if unknown).
+        if not query.get("seat"):
+            return self._store
+        if self._fleet is None:
+            return None
+        return self._fleet.seat(query["seat"][0])
+
+    def _file_response(self, filename, request_headers):
+        entry = self._assets.get(filename)
+        if entry is None:
+            return 404, {}, b""
+        encoding = _pick_encoding(request_headers.get("Accept-Encoding"), entry["bodies"])
+        headers = {
+            "ETag": entry["etags"][encoding],
+            "Cache-Control": entry["cache_control"],
+            "Vary": "Accept-Encoding",
+        }
+        # Any variant of the current content validates: the bytes differ but
+        # the resource has not changed.
+        if_none_match = request_headers.get("If-None-Match")
+        if any(_etag_matches(if_none_match, etag) for etag in entry["etags"].values()):
+            return 304, headers, b""
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        headers["Content-Type"] = entry["content_type"]
+        return 200, headers, entry["bodies"][encoding]
+
+    def _data_response(self, path, request_headers):
+        query = parse_qs(urlsplit(path).query)
+        store = self._seat_store(query)
+        if store is None:
+            return 404, {}, b""
+        since = None
+        try:
+            if query.get("since"):
+                since = _parse_version_token(query["since"][0])
+        except ValueError:
+            return 400, {}, b""
+        if since is None:
+            _STORE_READS.inc("payload")
+            version, payload = store.payload()
+        else:
+            _STORE_READS.inc("changes")
+            version, changes = store.changes_since(since)
+            payload = None
+        etag = f'"{_version_token(version)}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if since == version or _etag_matches(request_headers.get("If-None-Match"), etag):
+            return 304, headers, b""
+        if payload is None:
+            payload = json.dumps(changes, ensure_ascii=False).encode("utf-8")
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        return 200, headers, payload
+
+    def _fleet_response(self, request_headers):
+        if self._fleet is None:
+            return 404, {}, b""
+        version, payload = self._fleet.payload()
+        etag = f'"fleet-{_version_token(version)}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request_headers.get("If-None-Match"), etag):
+            return 304, headers, b""
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        return 200, headers, payload
+
+    def _history_response(self, path):
+        query = parse_qs(urlsplit(path).query)
+        store = self._seat_store(query)
+        if store is None:
+            return 404, {}, b""
+        since = None
+        try:
+            if query.get("since"):
+                since = float(query["since"][0])
+        except ValueError:
+            return 400, {}, b""
+        fields = None
+        if query.get("fields"):
+            fields = [key for key in query["fields"][0].split(",") if key]
+        keys, times, columns = store.history.query(since, fields)
+        if query.get("format", ["json"])[0] == "bin":
+            return (
+                200,
+                {"Content-Type": "application/octet-stream"},
+                _pack_history(keys, times, columns),
+            )
+        started = time.perf_counter()
+        payload = {"fields": keys, "t": times.tolist()}
+        payload["columns"] = {
+            key: [None if value != value else value for value in column]
+            for key, column in zip(keys, columns)
+        }
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        _SERIALIZE_SECONDS.observe(time.perf_counter() - started, "history")
+        return 200, {"Content-Type": "application/json; charset=utf-8"}, body
+
+    def _export_response(self, path):
+        query = parse_qs(urlsplit(path).query)
+        fmt = query.get("format", ["csv"])[0]
+        if fmt not in export.FORMATS:
+            return 400, {}, b""
+        if not export.available(fmt):
+            return (
+                501,
+                {"Content-Type": "text/plain; charset=utf-8"},
+                f"{fmt} export needs pyarrow on the server\n".encode("utf-8"),
+            )
+        fields = None
+        if query.get("fields"):
+            fields = [key for key in query["fields"][0].split(",") if key]
+        if query.get("session"):
+            log_path = self._session_path(query["session"][0])
+            if log_path is None:
+                return 404, {}, b""
+            name = os.path.splitext(os.path.basename(log_path))[0]
+            try:
+                layout = export.select_layout(export.log_layout(log_path), fields)
+            except (OSError, ValueError):
+                return 404, {}, b""
+            chunks = export.select_fields(flight_log.iter_chunks(log_path), fields)
+        else:
+            store = self._seat_store(query)
+            if store is None:
+                return 404, {}, b""
+            since = None
+            try:
+                if query.get("since"):
+                    since = float(query["since"][0])
+            except ValueError:
+                return 400, {}, b""
+            name = time.strftime("flight-%Y%m%d-%H%M%S")
+            layout = store.history.layout(fields)
+            chunks = store.history.iter_chunks(since, fields)
+        content_type, extension = export.FORMATS[fmt]
+        headers = {
+            "Content-Type": content_type,
+            "Content-Disposition": f'attachment; filename="{name}{extension}"',
+            "Cache-Control": "no-store",
+        }
+        return 200, headers, export.encode(fmt, chunks, name, layout)
+
+    def _track_response(self, path, request_headers):
+        query = parse_qs(urlsplit(path).query)
+        store = self._seat_store(query)
+        if store is None:
+            return 404, {}, b""
+        zoom = bbox = since = None
+        try:
+            if query.get("zoom"):
+                zoom = float(query["zoom"][0])
+            if query.get("since"):
+                since = float(query["since"][0])
+            if query.get("bbox"):
+                bbox = [float(value) for value in query["bbox"][0].split(",")]
+                if len(bbox) != 4 or bbox[1] > bbox[3]:
+                    return 400, {}, b""
+        except ValueError:
+            return 400, {}, b""
+        if not all(math.isfinite(value) for value in [zoom or 0.0, since or 0.0] + (bbox or [])):
+            return 400, {}, b""
+        if zoom is not None:
+            zoom = min(max(zoom, 0.0), _TRACK_MAX_ZOOM)
+        version, tolerance, segments = store.track.query(zoom, bbox, since)
+        etag = f'"track-{_version_token(version)}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request_headers.get("If-None-Match"), etag):
+            return 304, headers, b""
+        started = time.perf_counter()
+        payload = {
+            "version": version,
+            "tolerance_m": tolerance,
+            "segments": [
+                [
+                    [
+                        round(latitude, 6),
+                        round(longitude, 6),
+                        None if altitude is None or altitude != altitude else round(altitude),
+                        round(timestamp, 3),
+                    ]
+                    for timestamp, latitude, longitude, altitude in segment
+                ]
+                for segment in segments
+            ],
+        }
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        _SERIALIZE_SECONDS.observe(time.perf_counter() - started, "track")
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        return 200, headers, body
+
+    def _session_path(self, session):
+        # Only plain .fdl file names inside the recordings directory.
+        if not self._record_dir:
+            return None
+        session = os.path.basename(session)
+        if not session.endswith(flight_log.EXTENSION):
+            return None
+        path = os.path.join(self._record_dir, session)
+        try:
+            with open(path, "rb") as handle:
+                flight_log.read_header(handle)
+        except (OSError, ValueError):
+            return None
+        return path
+
     def _make_handler(self):
-        data_provider = self._data_provider
-        static_dir = self._static_dir
+        app = self
+        store = self._store
+        stopping = self._stopping
 
         class Handler(BaseHTTPRequestHandler):
+            def setup(self):
+                super().setup()
+                _HTTP_CONNECTIONS.inc("threading")
+
+            def finish(self):
+                _HTTP_CONNECTIONS.dec("threading")
+                super().finish()
+
             def do_GET(self):
-                if self.path == "/" or self.path.startswith("/index.html"):
-                    self._send_file("index.html", "text/html; charset=utf-8")
+                if app.is_stream(self.path):
+                    self._send_stream(store, "/stream")
                     return
-                if self.path.startswith("/style.css"):
-                    self._send_file("style.css", "text/css; charset=utf-8")
+                if app.is_fleet_stream(self.path):
+                    self._send_stream(app.fleet, "/fleet/stream")
                     return
-                if self.path.startswith("/html-lang.json"):
-                    self._send_file("html-lang.json", "application/json; charset=utf-8")
+                if app.is_websocket(self.path):
+                    self._serve_websocket()
                     return
-                if self.path.startswith("/data"):
-                    payload = json.dumps(data_provider(), ensure_ascii=False)
-                    self._send_bytes(
-                        payload.encode("utf-8"), "application/json; charset=utf-8"
-                    )
+                status, headers, body = app.respond(self.path, self.headers)
+                if not isinstance(body, bytes):
+                    self._send_chunked(status, headers, body)
                     return
-                self.send_response(404)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if status != 304:
+                    self.send_header("Content-Length", str(len(body)))
                 self.end_headers()
+                if body:
+                    self.wfile.write(body)
 
             def log_message(self, format, *args):
                 return
 
-            def _send_file(self, filename, content_type):
-                path = os.path.join(static_dir, filename)
-                try:
-                    with open(path, "rb") as f:
-                        body = f.read()
-                except OSError:
-                    self.send_response(404)
-                    self.end_headers()
-                    return
-                self._send_bytes(body, content_type)
+            def _send_stream(self, source, route):
+                self.send_response(200)
+                for name, value in _SSE_HEADERS.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                version, payload = source.payload()
+                _stream_opened(route)
+                _STORE_READS.inc("stream")
+                try:
+                    self._push(route, b"retry: 2000\ndata: " + payload + b"\n\n")
+                    while not stopping.is_set():
+                        latest, payload = source.wait_for_update(version, 15.0)
+                        if latest == version:
+                            self._push(route, b": keepalive\n\n")
+                            continue
+                        version = latest
+                        self._push(route, b"data: " + payload + b"\n\n")
+                except OSError:
+                    return
+                finally:
+                    _stream_closed(route)
+
+            def _push(self, route, data):
+                self.wfile.write(data)
+                _HTTP_BYTES.inc(route, amount=len(data))
+
+            def _send_chunked(self, status, headers, chunks):
+                # HTTP/1.0 clients cannot take chunked encoding; their body
+                # simply ends when the connection closes.
+                chunked = self.request_version != "HTTP/1.0"
+                if chunked:
+                    self.protocol_version = "HTTP/1.1"
+                self.close_connection = True
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if chunked:
+                    self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for data in chunks:
+                        if not data:
+                            continue
+                        if chunked:
+                            data = b"%x\r\n%s\r\n" % (len(data), data)
+                        self.wfile.write(data)
+                    if chunked:
+                        self.wfile.write(b"0\r\n\r\n")
+                except OSError:
+                    pass
+                finally:
+                    chunks.close()
+
+            def _serve_websocket(self):
+                key = self.headers.get("Sec-WebSocket-Key")
+                if not key or "websocket" not in (self.headers.get("Upgrade") or "").lower():
+                    self.send_response(400)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.protocol_version = "HTTP/1.1"
+                self.close_connection = True
+                self.send_response(101, "Switching Protocols")
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", _ws_accept(key))
+                self.end_headers()
+
+                session = WebSocketSession(fields=store.fields)
+                write_lock = threading.Lock()
+                closed = threading.Event()
+
+                def send(opcode, payload):
+                    with write_lock:
+                        self._push("/ws", _ws_frame(opcode, payload))
+
+                def read_exact(size):
+                    data = self.rfile.read(size)
+                    if len(data) != size:
+                        raise EOFError
+                    return data
+
+                def receive():
+                    message = b""
+                    try:
+                        while not closed.is_set():
+                            fin, opcode, payload = _ws_read_frame(read_exact)
+                            if opcode == _WS_CLOSE:
+                                send(_WS_CLOSE, payload[:2])
+                                break
+                            if opcode == _WS_PING:
+                                send(_WS_PONG, payload)
+                                continue
+                            if opcode not in (0, _WS_TEXT, _WS_BINARY):
+                                continue
+                            message += payload
+                            if len(message) > _WS_MAX_MESSAGE:
+                                break
+                            if fin:
+                                _STORE_READS.inc("snapshot")
+                                send(_WS_TEXT, session.subscribe(message, store.snapshot()))
+                                message = b""
+                    except (OSError, EOFError, ValueError):
+                        pass
+                    closed.set()
+
+                reader = threading.Thread(target=receive, daemon=True)
+                reader.start()
+                version = None
+                _stream_opened("/ws", 101)
+                try:
+                    while not closed.is_set() and not stopping.is_set():
+                        if not session.subscribed:
+                            closed.wait(0.1)
+                            continue
+                        store.wait_for_version(version, 0.25)
+                        current = store.current()
+                        if current.version == version and not session.pending:
+                            continue
+                        version = current.version
+                        frame = session.encode(current.data, version)
+                        if frame is not None:
+                            send(_WS_BINARY, frame)
+                        closed.wait(session.interval)
+                except OSError:
+                    pass
+                finally:
+                    _stream_closed("/ws")
+                closed.set()
+
+        return Handler
+
+
+class _RequestHeaders(dict):
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+
+class AsyncHTTPServer:
+    # Single-threaded asyncio alternative to ThreadingHTTPServer. Connections
+    # are kept alive between requests and the number served at once is capped;
+    # extra connections wait for a slot instead of each getting an OS thread.
+    def __init__(self, app, host, port, max_connections=512, idle_timeout=15.0):
+        _load_asyncio()
+        self._app = app
+        self._host = host
+        self._port = port
+        self._max_connections = max(int(max_connections), 1)
+        self._idle_timeout = idle_timeout
+        self._loop = None
+        self._stopped = None
+        self._ready = threading.Event()
+        self._listening = False
+        self._tick = None
+        self._slots = None
+        self._connections = set()
+
+    def serve_forever(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    def shutdown(self):
+        self._ready.wait(5.0)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                pass
+
+    def server_close(self):
+        return
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout) and self._listening
+
+    async def _serve(self):
+        self._stopped = asyncio.Event()
+        self._tick = asyncio.Event()
+        self._slots = asyncio.Semaphore(self._max_connections)
+        store = self._app.store
+        fleet = self._app.fleet
+        store.add_listener(self._notify)
+        if fleet is not None:
+            fleet.add_listener(self._notify)
+        try:
+            server = await asyncio.start_server(
+                self._handle, self._host, self._port, reuse_address=True, backlog=1024
+            )
+            async with server:
+                self._listening = True
+                self._ready.set()
+                await self._stopped.wait()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        finally:
+            self._ready.set()
+            store.remove_listener(self._notify)
+            if fleet is not None:
+                fleet.remove_listener(self._notify)
+
+    def _notify(self):
+        # Called from the collector thread on every DataStore update.
+        try:
+            self._loop.call_soon_threadsafe(self._wake_streams)
+        except RuntimeError:
+            pass
+
+    def _wake_streams(self):
+        tick, self._tick = self._tick, asyncio.Event()
+        tick.set()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        _HTTP_CONNECTIONS.inc("asyncio")
+        try:
+            async with self._slots:
+                while not self._stopped.is_set():
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, version, headers = request
+                    keep_alive = self._keep_alive(version, headers)
+                    if method != "GET":
+                        await self._write(writer, 501, {}, b"", keep_alive)
+                    elif self._app.is_stream(path):
+                        await self._stream(writer)
+                        break
+                    elif self._app.is_fleet_stream(path):
+                        await self._stream(writer, self._app.fleet)
+                        break
+                    elif self._app.is_websocket(path):
+                        await self._websocket(reader, writer, headers)
+                        break
+                    else:
+                        if self._app.is_slow(path):
+                            loop = asyncio.get_running_loop()
+                            status, response_headers, body = await loop.run_in_executor(
+                                None, self._app.respond, path, headers
+                            )
+                        else:
+                            status, response_headers, body = self._app.respond(path, headers)
+                        if isinstance(body, bytes):
+                            await self._write(writer, status, response_headers, body, keep_alive)
+                        else:
+                            keep_alive = await self._write_chunked(
+                                writer, version, status, response_headers, body, keep_alive
+                            )
+                    if not keep_alive:
+                        break
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Only raised by shutdown; finishing normally keeps asyncio's
+            # stream callbacks from reporting the cancellation as an error.
+            pass
+        finally:
+            _HTTP_CONNECTIONS.dec("asyncio")
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            raw = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), self._idle_timeout
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        lines = raw.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3:
+            return None
+        method, path, version = parts
+        headers = _RequestHeaders()
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("Content-Length", "0") or 0)
+        if length:
+            await reader.readexactly(length)
+        return method, path, version, headers
+
+    def _keep_alive(self, version, headers):
+        connection = headers.get("Connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _write(self, writer, status, headers, body, keep_alive):
+        reason = http.HTTPStatus(status).phrase
+        lines = [f"HTTP/1.1 {status} {reason}"]
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _write_chunked(self, writer, version, status, headers, chunks, keep_alive):
+        # Generator bodies (exports) are produced on a worker thread one chunk
+        # at a time, so a long export neither blocks the loop nor sits in memory.
+        chunked = version != "HTTP/1.0"
+        keep_alive = keep_alive and chunked
+        reason = http.HTTPStatus(status).phrase
+        lines = [f"HTTP/1.1 {status} {reason}"]
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+        if chunked:
+            lines.append("Transfer-Encoding: chunked")
+        lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await loop.run_in_executor(None, next, chunks, None)
+                if data is None:
+                    break
+                if not data:
+                    continue
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+                await writer.drain()
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            try:
+                chunks.close()
+            except ValueError:
+                # Still running on the worker thread after a cancellation.
+                pass
+        return keep_alive
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("Sec-WebSocket-Key")
+        if not key or "websocket" not in headers.get("Upgrade", "").lower():
+            await self._write(writer, 400, {}, b"", False)
+            return
+        lines = [
+            "HTTP/1.1 101 Switching Protocols",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Accept: {_ws_accept(key)}",
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        store = self._app.store
+        session = WebSocketSession(fields=store.fields)
+        subscribed = asyncio.Event()
+        receiver = asyncio.ensure_future(
+            self._ws_receive(reader, writer, session, subscribed)
+        )
+        version = None
+        _stream_opened("/ws", 101)
+        try:
+            while not receiver.done() and not self._stopped.is_set():
+                if not session.subscribed:
+                    await self._wait_either(receiver, subscribed)
+                    continue
+                tick = self._tick
+                current = store.current()
+                if current.version == version and not session.pending:
+                    await self._wait_either(receiver, tick)
+                    continue
+                version = current.version
+                frame = session.encode(current.data, version)
+                if frame is not None:
+                    frame = _ws_frame(_WS_BINARY, frame)
+                    writer.write(frame)
+                    _HTTP_BYTES.inc("/ws", amount=len(frame))
+                    await writer.drain()
+                await asyncio.sleep(session.interval)
+        finally:
+            _stream_closed("/ws")
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+
+    async def _wait_either(self, task, event, timeout=1.0):
+        waiter = asyncio.ensure_future(event.wait())
+        try:
+            await asyncio.wait(
+                {task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            waiter.cancel()
+
+    async def _ws_receive(self, reader, writer, session, subscribed):
+        message = b""
+        while True:
+            first, second = await reader.readexactly(2)
+            size = second & 0x7F
+            if size == 126:
+                size = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif size == 127:
+                size = struct.unpack("!Q", await reader.readexactly(8))[0]
+            if size > _WS_MAX_MESSAGE or not second & 0x80:
+                return
+            mask = await reader.readexactly(4)
+            payload = _ws_unmask(await reader.readexactly(size), mask)
+            opcode = first & 0x0F
+            if opcode == _WS_CLOSE:
+                writer.write(_ws_frame(_WS_CLOSE, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == _WS_PING:
+                writer.write(_ws_frame(_WS_PONG, payload))
+                await writer.drain()
+                continue
+            if opcode not in (0, _WS_TEXT, _WS_BINARY):
+                continue
+            message += payload
+            if len(message) > _WS_MAX_MESSAGE:
+                return
+            if first & 0x80:
+                _STORE_READS.inc("snapshot")
+                reply = session.subscribe(message, self._app.store.snapshot())
+                message = b""
+                writer.write(_ws_frame(_WS_TEXT, reply))
+                await writer.drain()
+                subscribed.set()
+
+    async def _stream(self, writer, fleet=None):
+        source = self._app.store if fleet is None else fleet
+        route = "/stream" if fleet is None else "/fleet/stream"
+        lines = ["HTTP/1.1 200 OK", "Connection: close"]
+        lines.extend(f"{name}: {value}" for name, value in _SSE_HEADERS.items())
+        version, payload = source.payload()
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        _stream_opened(route)
+        _STORE_READS.inc("stream")
+        try:
+            await self._push(writer, route, b"retry: 2000\ndata: " + payload + b"\n\n")
+            while not self._stopped.is_set():
+                tick = self._tick
+                if source.version != version:
+                    if fleet is None:
+                        version, payload = source.payload()
+                    else:
+                        version, payload = fleet.payload_since(version)
+                    await self._push(writer, route, b"data: " + payload + b"\n\n")
+                    continue
+                try:
+                    await asyncio.wait_for(tick.wait(), 15.0)
+                except asyncio.TimeoutError:
+                    await self._push(writer, route, b": keepalive\n\n")
+        finally:
+            _stream_closed(route)
+
+    async def _push(self, writer, route, data):
+        writer.write(data)
+        _HTTP_BYTES.inc(route, amount=len(data))
+        await writer.drain()
+
+
+_FLEET_MAX_LINE = 65536
+# Values a feeder may set besides the fleet's fields.
+_FLEET_EXTRA_FIELDS = ("sample_time", "sample_rate_hz", "sample_jitter_ms")
+_FLEET_SOURCES = frozenset(
+    ("idle", "unavailable", "offline", "simconnect", "fsuipc", "replay", "mock")
+)
+
+
+def _fleet_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _fleet_changes(data, fields):
+    # Keeps only what a seat's DataStore should hold: finite numbers for
+    # known fields, rates of known fields and a known source name.
+    changes = {}
+    for key, value in data.items():
+        if key in fields or key in _FLEET_EXTRA_FIELDS:
+            value = _fleet_number(value)
+            if value is not None:
+                changes[key] = value
+        elif key == "rates" and isinstance(value, dict):
+            rates = {}
+            for name, rate in value.items():
+                rate = _fleet_number(rate)
+                if name in fields and rate is not None:
+                    rates[name] = rate
+            changes[key] = rates
+        elif key == "source" and value in _FLEET_SOURCES:
+            changes[key] = value
+    return changes
+
+
+class _FleetIngestHandler(socketserver.StreamRequestHandler):
+    # One feeder connection: newline-delimited JSON objects of the form
+    # {"seat": "<id>", "data": {<changed fields>}}. Seats fed over a connection
+    # are marked offline when it drops.
+    def handle(self):
+        fleet = self.server.fleet
+        fields = frozenset(fleet.fields)
+        seats = set()
+        try:
+            while True:
+                line = self.rfile.readline(_FLEET_MAX_LINE + 1)
+                if not line or len(line) > _FLEET_MAX_LINE:
+                    break
+                try:
+                    message = json.loads(line)
+                    seat = str(message["seat"])[:64]
+                    data = message["data"]
+                    if not seat or not isinstance(data, dict):
+                        continue
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if fleet.update(seat, _fleet_changes(data, fields)):
+                    seats.add(seat)
+        except OSError:
+            pass
+        finally:
+            for seat in seats:
+                fleet.update(seat, {"source": "offline"})
+
+
+class _FleetTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FleetIngestServer:
+    def __init__(self, fleet, host, port):
+        self._fleet = fleet
+        self._host = host
+        self._port = port
+        self._server = None
+
+    def start(self):
+        if self._server:
+            return
+        self._server = _FleetTCPServer((self._host, self._port), _FleetIngestHandler)
+        self._server.fleet = self._fleet
+        self._server.serve_forever()
+
+    def stop(self):
+        if not self._server:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+
+class FleetFeeder(threading.Thread):
+    # Forwards one seat's DataStore to an aggregating server's fleet port: the
+    # full snapshot on connect, then only the fields changed since the last
+    # line. Reconnects with backoff while the aggregator is away.
+    def __init__(self, store, seat, host, port, min_backoff=1.0, max_backoff=30.0):
+        super().__init__(daemon=True)
+        self._store = store
+        self._seat = seat
+        self._address = (host, port)
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
 
-            def _send_bytes(self, body, content_type):
-                self.send_response(200)
-                self.send_header("Content-Type", content_type)
-                self.send_header("Content-Length", str(len(body)))
-                self.end_headers()
-                self.wfile.write(body)
+    def run(self):
+        backoff = self._min_backoff
+        while not self._stopping.is_set():
+            try:
+                with socket.create_connection(self._address, timeout=5.0) as sock:
+                    backoff = self._min_backoff
+                    self._feed(sock)
+            except OSError:
+                pass
+            self._stopping.wait(backoff)
+            backoff = min(backoff * 2, self._max_backoff)
+
+    def _feed(self, sock):
+        current = self._store.current()
+        version = current.version
+        self._send(sock, current.data)
+        while not self._stopping.is_set():
+            latest = self._store.wait_for_version(version, 1.0)
+            if latest == version:
+                continue
+            version, changes = self._store.changes_since(version)
+            self._send(sock, changes)
 
-        return Handler
+    def _send(self, sock, data):
+        data = {key: value for key, value in data.items() if key not in _STORE_META}
+        if not data:
+            return
+        line = json.dumps({"seat": self._seat, "data": data}, ensure_ascii=False)
+        sock.sendall(line.encode("utf-8") + b"\n")
+
+
+# Values from SimConnect.h; the python SimConnect package only wraps a subset.
+_SIMCONNECT_DATATYPE_FLOAT64 = 4
+_SIMCONNECT_PERIOD_SIM_FRAME = 3
+_SIMCONNECT_PERIOD_SECOND = 4
+_SIMCONNECT_OBJECT_ID_USER = 0
+_SIMCONNECT_UNUSED = 0xFFFFFFFF
+_SIMCONNECT_RECV_ID_SIMOBJECT_DATA = 8
+# Kept well above the ids the SimConnect package hands out for its own
+# requests; tier i uses definition and request id base + i.
+_SIMCONNECT_DEFINITION_ID = 0x4644
+_SIMCONNECT_REQUEST_ID = 0x4644
+# Rate tiers are turned into frame skips assuming this sim frame rate.
+_SIMCONNECT_NOMINAL_FPS = 30.0
+
+
+class _SimConnectRecv(ctypes.Structure):
+    _fields_ = [
+        ("dwSize", ctypes.c_uint32),
+        ("dwVersion", ctypes.c_uint32),
+        ("dwID", ctypes.c_uint32),
+    ]
+
+
+class _SimObjectData(ctypes.Structure):
+    # SIMCONNECT_RECV_SIMOBJECT_DATA; the data block starts at dwData and runs
+    # on past the end of this struct.
+    _fields_ = _SimConnectRecv._fields_ + [
+        ("dwRequestID", ctypes.c_uint32),
+        ("dwObjectID", ctypes.c_uint32),
+        ("dwDefineID", ctypes.c_uint32),
+        ("dwFlags", ctypes.c_uint32),
+        ("dwentrynumber", ctypes.c_uint32),
+        ("dwoutof", ctypes.c_uint32),
+        ("dwDefineCount", ctypes.c_uint32),
+        ("dwData", ctypes.c_uint32 * 1),
+    ]
+
+
+def _simconnect_period(rate_hz):
+    # RequestDataOnSimObject sends once every `interval + 1` periods.
+    if rate_hz <= 0:
+        return _SIMCONNECT_PERIOD_SIM_FRAME, 0
+    if rate_hz >= 1:
+        skip = int(round(_SIMCONNECT_NOMINAL_FPS / rate_hz)) - 1
+        return _SIMCONNECT_PERIOD_SIM_FRAME, max(skip, 0)
+    return _SIMCONNECT_PERIOD_SECOND, max(int(round(1.0 / rate_hz)) - 1, 0)
 
 
 class SimConnectReader:
-    def __init__(self):
+    def __init__(self, module=None, stale_after=3.0, catalog=None):
         self._available = False
         self._connected = False
         self._simconnect = None
         self._requests = None
+        self._subscribed = False
+        self._subscribed_at = 0.0
+        self._frame = None
+        self._stale_after = stale_after
+        self._groups = (catalog or VariableCatalog()).simconnect_groups()
+        self._clock = _TierClock([rate for rate, _members in self._groups])
+        self._polled = {}
 
         try:
-            from SimConnect import SimConnect, AircraftRequests
+            if module is None:
+                import SimConnect as module
 
-            self._SimConnect = SimConnect
-            self._AircraftRequests = AircraftRequests
+            self._SimConnect = module.SimConnect
+            self._AircraftRequests = module.AircraftRequests
             self._available = True
         except Exception:
             self._available = False
@@ -193,44 +2562,159 @@ class SimConnectReader:
     def available(self):
         return self._available
 
+    @property
+    def subscribed(self):
+        return self._subscribed
+
     def connect(self):
         if not self._available or self._connected:
             return self._connected
         try:
             self._simconnect = self._SimConnect()
-            self._requests = self._AircraftRequests(self._simconnect, _time=2000)
+            self._subscribed = self._subscribe()
+            if self._subscribed:
+                self._subscribed_at = time.monotonic()
+            else:
+                self._start_polling()
             self._connected = True
         except Exception:
             self._connected = False
         return self._connected
 
+    def disconnect(self):
+        simconnect = self._simconnect
+        self._connected = False
+        self._subscribed = False
+        self._frame = None
+        self._simconnect = None
+        self._requests = None
+        if simconnect is not None:
+            try:
+                simconnect.exit()
+            except Exception:
+                pass
+
     def read(self):
         if not self._connected:
             return None
+        if self._subscribed:
+            frame = self._frame
+            if frame is None:
+                if time.monotonic() - self._subscribed_at > self._stale_after:
+                    # Subscribed, but not one frame arrived: poll instead.
+                    try:
+                        self._start_polling()
+                    except Exception:
+                        pass
+                return None
+            received, data = frame
+            if time.monotonic() - received > self._stale_after:
+                return None
+            return dict(data)
         try:
-            return {
-                "altitude_ft": float(self._requests.get("PLANE_ALTITUDE")),
-                "heading_deg": float(self._requests.get("PLANE_HEADING_DEGREES_TRUE")),
-                "airspeed_kt": float(self._requests.get("AIRSPEED_INDICATED")),
-                "vertical_speed_fpm": float(self._requests.get("VERTICAL_SPEED")),
-                "latitude": float(self._requests.get("PLANE_LATITUDE")),
-                "longitude": float(self._requests.get("PLANE_LONGITUDE")),
-                "pitch_deg": float(self._requests.get("PLANE_PITCH_DEGREES")),
-                "bank_deg": float(self._requests.get("PLANE_BANK_DEGREES")),
-                "fuel_total_gal": float(self._requests.get("FUEL_TOTAL_QUANTITY")),
-                "source": "simconnect",
-            }
+            return self._read_polled()
         except Exception:
             return None
 
+    def _start_polling(self):
+        self._subscribed = False
+        self._requests = self._AircraftRequests(self._simconnect, _time=2000)
+        self._clock.reset()
+        self._polled = {}
+
+    def _subscribe(self):
+        # One data definition per rate tier, each pushed by the sim as a single
+        # struct at the tier's rate. Older SimConnect packages without raw dll
+        # access fall back to per-variable AircraftRequests.
+        sm = self._simconnect
+        if not self._groups:
+            return False
+        try:
+            dll = sm.dll
+            handle = sm.hSimConnect
+            fallback = sm.my_dispatch_proc
+            requests = {}
+            for index, (_rate, members) in enumerate(self._groups):
+                for _key, simvar, unit in members:
+                    dll.AddToDataDefinition(
+                        handle,
+                        _SIMCONNECT_DEFINITION_ID + index,
+                        simvar.encode("utf-8"),
+                        unit.encode("utf-8"),
+                        _SIMCONNECT_DATATYPE_FLOAT64,
+                        0,
+                        _SIMCONNECT_UNUSED,
+                    )
+                requests[_SIMCONNECT_REQUEST_ID + index] = [key for key, *_rest in members]
+
+            # The package's dispatch proc only forwards the _BYTYPE replies of
+            # its own requests; RequestDataOnSimObject answers with plain
+            # SIMOBJECT_DATA, so ours sits in front of it. The package's
+            # dispatch loop looks the proc up on every call.
+            def dispatch(data, size, context):
+                try:
+                    recv_id = ctypes.cast(data, ctypes.POINTER(_SimConnectRecv)).contents.dwID
+                    if recv_id == _SIMCONNECT_RECV_ID_SIMOBJECT_DATA:
+                        obj = ctypes.cast(data, ctypes.POINTER(_SimObjectData)).contents
+                        keys = requests.get(obj.dwRequestID)
+                        if keys is not None:
+                            self._on_frame(obj, keys)
+                            return
+                except Exception:
+                    return
+                fallback(data, size, context)
+
+            sm.my_dispatch_proc_rd = dll.DispatchProc(dispatch)
+            for index, (rate, _members) in enumerate(self._groups):
+                period, interval = _simconnect_period(rate)
+                dll.RequestDataOnSimObject(
+                    handle,
+                    _SIMCONNECT_REQUEST_ID + index,
+                    _SIMCONNECT_DEFINITION_ID + index,
+                    _SIMCONNECT_OBJECT_ID_USER,
+                    period,
+                    0,
+                    0,
+                    interval,
+                    0,
+                )
+        except Exception:
+            return False
+        return True
+
+    def _on_frame(self, obj, keys):
+        # Runs on the SimConnect dispatch thread. Each tier's struct is merged
+        # into a fresh dict that is swapped in whole, so readers never see a
+        # half-applied tier.
+        try:
+            values = ctypes.cast(
+                obj.dwData, ctypes.POINTER(ctypes.c_double * len(keys))
+            ).contents
+            frame = self._frame
+            data = dict(frame[1]) if frame is not None else {"source": "simconnect"}
+            for key, value in zip(keys, values):
+                data[key] = float(value)
+        except Exception:
+            return
+        self._frame = (time.monotonic(), data)
+
+    def _read_polled(self):
+        for index in self._clock.due(time.monotonic()):
+            _rate, members = self._groups[index]
+            for key, simvar, _unit in members:
+                self._polled[key] = float(self._requests.get(simvar.replace(" ", "_")))
+        data = dict(self._polled)
+        data["source"] = "simconnect"
+        return data
+
 
 class FsuipcReader:
-    def __init__(self):
+    def __init__(self, catalog=None):
         self._available = False
         self._connected = False
         self._pyuipc = None
-        self._prepared = None
-        self._offset_specs = []
+        self._prepared = []
+        self._values = {}
 
         try:
             import pyuipc
@@ -240,7 +2724,9 @@ class FsuipcReader:
         except Exception:
             self._available = False
 
-        self._offset_specs = self._load_offsets()
+        groups = (catalog or VariableCatalog()).fsuipc_groups()
+        self._groups = [(specs, self._compile_converter(specs)) for _rate, specs in groups]
+        self._clock = _TierClock([rate for rate, _specs in groups])
 
     @property
     def available(self):
@@ -251,28 +2737,81 @@ class FsuipcReader:
             return self._connected
         try:
             self._pyuipc.open(self._pyuipc.SIM_ANY)
-            self._prepared = self._pyuipc.prepare_data(
-                [(spec["offset"], spec["type"]) for _key, spec in self._offset_specs]
-            )
+            self._prepared = [
+                self._pyuipc.prepare_data(
+                    [(spec["offset"], spec["type"]) for _key, spec in specs]
+                )
+                for specs, _convert in self._groups
+            ]
+            self._clock.reset()
+            self._values = {}
             self._connected = True
         except Exception:
             self._connected = False
         return self._connected
 
-    def read(self):
+    def disconnect(self):
         if not self._connected:
-            return None
+            return
+        self._connected = False
         try:
-            values = self._pyuipc.read(self._prepared)
+            self._pyuipc.close()
         except Exception:
-            self._connected = False
+            pass
+
+    def read(self):
+        if not self._connected:
             return None
-        data = {}
-        for (key, spec), raw in zip(self._offset_specs, values):
-            data[key] = self._convert_value(raw, spec)
+        # Only the tiers that are due cost an IPC round trip; the rest keep
+        # their last converted values.
+        for index in self._clock.due(time.monotonic()):
+            specs, convert = self._groups[index]
+            try:
+                values = self._pyuipc.read(self._prepared[index])
+            except Exception:
+                self._connected = False
+                return None
+            try:
+                self._values.update(convert(values))
+            except Exception:
+                for (key, spec), raw in zip(specs, values):
+                    self._values[key] = self._convert_value(raw, spec)
+        data = dict(self._values)
         data["source"] = "fsuipc"
         return data
 
+    def _compile_converter(self, specs):
+        # Scales are resolved once, with the divisor folded in, so each sample
+        # costs one multiply-add per field instead of re-parsing the spec.
+        # String offsets still go through _decode_string.
+        numeric = []
+        strings = []
+        for index, (key, spec) in enumerate(specs):
+            if isinstance(spec["type"], int):
+                strings.append((key, index))
+                continue
+            scale = spec["scale"]
+            if spec["divisor"]:
+                scale /= spec["divisor"]
+            numeric.append((key, index, scale, spec["offset_add"]))
+        decode = self._decode_string
+
+        def convert(values):
+            converted = {
+                key: values[index] * scale + offset_add
+                for key, index, scale, offset_add in numeric
+            }
+            for key, index in strings:
+                converted[key] = decode(values[index])
+            return converted
+
+        return convert
+
+    def _decode_string(self, raw):
+        if isinstance(raw, (bytes, bytearray)):
+            return raw.decode("utf-8", errors="ignore").strip("\x00")
+        return str(raw)
+
     def _convert_value(self, raw, spec):
         if isinstance(raw, (bytes, bytearray)):
             try:
@@ -287,144 +2826,816 @@ class FsuipcReader:
             value = value / float(divisor)
         return value * scale + offset_add
 
-    def _load_offsets(self):
-        path = os.path.join(os.getcwd(), "fsuipc_offsets.json")
-        if not os.path.exists(path):
-            self._write_default_offsets(path)
+
+class FlightRecorder(threading.Thread):
+    _STOP = object()
+
+    def __init__(
+        self,
+        directory,
+        fields=_FLIGHT_FIELDS,
+        chunk_samples=1024,
+        flush_seconds=5.0,
+        fsync_seconds=30.0,
+    ):
+        super().__init__(daemon=True)
+        self._directory = directory
+        self._fields = list(fields)
+        self._chunk_samples = chunk_samples
+        self._flush_seconds = flush_seconds
+        self._fsync_seconds = fsync_seconds
+        # Bounded so a stuck disk can only cost dropped samples, never a
+        # blocked sampling loop.
+        self._queue = queue.Queue(maxsize=chunk_samples * 8)
+        self.path = None
+        self.dropped = 0
+
+    def submit(self, timestamp, data):
         try:
-            with open(path, "r", encoding="utf-8") as handle:
-                data = json.load(handle)
+            self._queue.put_nowait((timestamp, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        while True:
+            try:
+                self._queue.put(self._STOP, timeout=1.0)
+                break
+            except queue.Full:
+                if not self.is_alive():
+                    return
+        self.join(timeout=10.0)
+
+    def run(self):
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            name = time.strftime("flight-%Y%m%d-%H%M%S") + flight_log.EXTENSION
+            self.path = os.path.join(self._directory, name)
+            writer = flight_log.FlightLogWriter(
+                self.path, self._fields, wide_fields=("latitude", "longitude")
+            )
+        except Exception:
+            return
+        times = array("d")
+        columns = [array("d") for _key in self._fields]
+        last_flush = last_sync = time.monotonic()
+        stopping = False
+        try:
+            while not stopping:
+                try:
+                    item = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    item = None
+                while item is not None:
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    timestamp, data = item
+                    times.append(timestamp)
+                    for column, key in zip(columns, self._fields):
+                        value = data.get(key)
+                        column.append(value if isinstance(value, float) else math.nan)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+                now = time.monotonic()
+                due = now - last_flush >= self._flush_seconds
+                if len(times) >= self._chunk_samples or (times and (due or stopping)):
+                    writer.write_chunk(times, columns)
+                    writer.flush()
+                    times = array("d")
+                    columns = [array("d") for _key in self._fields]
+                    last_flush = now
+                if now - last_sync >= self._fsync_seconds:
+                    writer.sync()
+                    last_sync = now
         except Exception:
-            data = self._default_offsets()
-        specs = []
-        for key, spec in data.items():
+            pass
+        finally:
             try:
-                offset_value = int(str(spec["offset"]), 16)
+                writer.close()
             except Exception:
-                continue
-            specs.append(
-                (
-                    key,
-                    {
-                        "offset": offset_value,
-                        "type": spec.get("type", "d"),
-                        "scale": spec.get("scale", 1.0),
-                        "offset_add": spec.get("offset_add", 0.0),
-                        "divisor": spec.get("divisor"),
-                    },
-                )
+                pass
+
+
+# UDP telemetry datagrams (all little-endian):
+#   sample: b"FDXU", u16 version, u16 field count, u32 layout id, u32 sequence,
+#           f64 unix timestamp, then one value per field in layout order
+#           (float32, or float64 for wide fields; NaN when missing)
+#   schema: b"FDXS", u16 version, u16 field count, u32 layout id, then per
+#           field a u8 name length, utf-8 name and typecode ("f" or "d")
+# The layout id is the CRC-32 of the schema fields, so a receiver can tell a
+# sample from a layout it has not seen. The schema is resent every second.
+_UDP_MAGIC = b"FDXU"
+_UDP_SCHEMA_MAGIC = b"FDXS"
+_UDP_VERSION = 1
+_UDP_HEADER = struct.Struct("<4sHHIId")
+_UDP_SCHEMA_HEADER = struct.Struct("<4sHHI")
+
+
+class UdpPublisher:
+    # Sends each sample as one fixed-layout datagram to a unicast, broadcast or
+    # multicast address. The socket is non-blocking: a full send buffer drops
+    # the datagram (counted in `dropped`) instead of stalling the collector.
+    # `sent` and `dropped` count sample datagrams; the periodic schema
+    # datagrams are counted in `schemas_sent` and `schemas_dropped`.
+    def __init__(
+        self,
+        host,
+        port,
+        fields=_FLIGHT_FIELDS,
+        wide_fields=("latitude", "longitude"),
+        max_rate_hz=60.0,
+        ttl=1,
+        schema_interval=1.0,
+    ):
+        if host == "<broadcast>":
+            host = "255.255.255.255"
+        # Resolved once here: sendto() with a host name would look it up again
+        # for every datagram, blocking the collector thread.
+        self._address = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+        host = self._address[0]
+        self._fields = tuple(fields)
+        typecodes = "".join("d" if key in wide_fields else "f" for key in self._fields)
+        self._values = struct.Struct("<" + typecodes)
+        schema = []
+        for key, typecode in zip(self._fields, typecodes):
+            name = key.encode("utf-8")
+            schema.append(struct.pack("<B", len(name)) + name + typecode.encode("ascii"))
+        schema = b"".join(schema)
+        self._layout = zlib.crc32(schema)
+        self._schema = (
+            _UDP_SCHEMA_HEADER.pack(
+                _UDP_SCHEMA_MAGIC, _UDP_VERSION, len(self._fields), self._layout
             )
-        return specs
+            + schema
+        )
+        self._interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        self._schema_interval = schema_interval
+        self._due = 0.0
+        self._schema_due = 0.0
+        self._sequence = 0
+        self.sent = 0
+        self.dropped = 0
+        self.schemas_sent = 0
+        self.schemas_dropped = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        if host == "255.255.255.255":
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        elif _is_multicast(host):
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, int(ttl))
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+    def publish(self, timestamp, data):
+        # Sends are spaced on a deadline grid with a quarter-interval of slack,
+        # so samples jittering around the limit are not skipped every other
+        # time, yet the long-run rate never exceeds max_rate_hz.
+        now = time.monotonic()
+        if now < self._due - self._interval / 4:
+            return False
+        if now - self._due < self._interval:
+            self._due += self._interval
+        else:
+            self._due = now + self._interval
+        if now >= self._schema_due:
+            self._schema_due = now + self._schema_interval
+            if self._send(self._schema):
+                self.schemas_sent += 1
+            else:
+                self.schemas_dropped += 1
+        self._sequence = (self._sequence + 1) & 0xFFFFFFFF
+        values = []
+        for key in self._fields:
+            value = data.get(key)
+            values.append(value if isinstance(value, float) else math.nan)
+        head = _UDP_HEADER.pack(
+            _UDP_MAGIC,
+            _UDP_VERSION,
+            len(self._fields),
+            self._layout,
+            self._sequence,
+            timestamp,
+        )
+        if not self._send(head + self._values.pack(*values)):
+            self.dropped += 1
+            return False
+        self.sent += 1
+        return True
 
-    def _write_default_offsets(self, path):
+    def close(self):
+        self._sock.close()
+
+    def _send(self, datagram):
         try:
-            with open(path, "w", encoding="utf-8") as handle:
-                json.dump(self._default_offsets(), handle, indent=2)
-        except Exception:
-            pass
+            self._sock.sendto(datagram, self._address)
+        except OSError:
+            return False
+        return True
+
+
+def _is_multicast(host):
+    try:
+        return 224 <= int(host.split(".")[0]) <= 239
+    except ValueError:
+        return False
+
+
+class MockReader:
+    # Deterministic synthetic flight: simulated time advances by one sample
+    # period per read, so the same rate always produces the same sequence.
+    def __init__(self, rate_hz=10.0):
+        self._period = 1.0 / _clamp_rate(rate_hz)
+        self._index = 0
+
+    @property
+    def available(self):
+        return True
+
+    def connect(self):
+        return True
 
-    def _default_offsets(self):
+    def disconnect(self):
+        return
+
+    def read(self):
+        elapsed = self._index * self._period
+        self._index += 1
         return {
-            "altitude_ft": {
-                "offset": "0x0570",
-                "type": "d",
-                "scale": 1 / 65536,
-            },
-            "heading_deg": {
-                "offset": "0x0580",
-                "type": "u",
-                "scale": 360 / 65536,
-            },
-            "airspeed_kt": {
-                "offset": "0x02BC",
-                "type": "u",
-                "scale": 1 / 128,
-            },
-            "vertical_speed_fpm": {
-                "offset": "0x02C8",
-                "type": "d",
-                "scale": 1 / 256,
-            },
-            "latitude": {
-                "offset": "0x0560",
-                "type": "l",
-                "scale": 90 / 2147483648,
-            },
-            "longitude": {
-                "offset": "0x0568",
-                "type": "l",
-                "scale": 360 / 4294967296,
-            },
-            "pitch_deg": {
-                "offset": "0x0578",
-                "type": "d",
-                "scale": 360 / 65536,
-            },
-            "bank_deg": {
-                "offset": "0x057C",
-                "type": "d",
-                "scale": 360 / 65536,
-            },
-            "fuel_total_gal": {
-                "offset": "0x0B7C",
-                "type": "u",
-                "scale": 1.0,
-            },
+            "altitude_ft": 3500 + 800 * math.sin(elapsed / 8.0),
+            "heading_deg": (elapsed * 6) % 360,
+            "airspeed_kt": 120 + 25 * math.sin(elapsed / 5.0),
+            "vertical_speed_fpm": 400 * math.sin(elapsed / 4.0),
+            "latitude": 31.25 + 0.05 * math.sin(elapsed / 15.0),
+            "longitude": 121.50 + 0.05 * math.cos(elapsed / 15.0),
+            "pitch_deg": 2.5 * math.sin(elapsed / 6.0),
+            "bank_deg": 10 * math.sin(elapsed / 7.0),
+            "fuel_total_gal": 56 - (elapsed / 1200.0),
+            "source": "mock",
         }
 
 
+class ReplayReader:
+    # Plays a recorded flight log back against the wall clock at `speed`x,
+    # returning the latest recorded sample due at each read.
+    def __init__(self, path, speed=1.0, loop=True):
+        self._path = path
+        self._speed = speed if speed > 0 else 1.0
+        self._loop = loop
+        self._samples = None
+        self._pending = None
+        self._current = None
+        self._origin = None
+
+    @property
+    def available(self):
+        return bool(self._path) and os.path.exists(self._path)
+
+    def connect(self):
+        if self._samples is not None:
+            return True
+        try:
+            self._samples = flight_log.iter_samples(self._path)
+            self._pending = next(self._samples)
+        except Exception:
+            self._samples = None
+            return False
+        self._origin = (time.monotonic(), self._pending[0])
+        self._current = None
+        return True
+
+    def disconnect(self):
+        self._samples = None
+
+    def read(self):
+        if self._samples is None:
+            return None
+        started, first = self._origin
+        due = first + (time.monotonic() - started) * self._speed
+        while self._pending is not None and self._pending[0] <= due:
+            self._current = self._pending
+            self._pending = next(self._samples, None)
+        if self._pending is None and self._loop:
+            current = self._current
+            self._samples = None
+            self.connect()
+            self._current = current
+        if self._current is None:
+            return None
+        data = {key: value for key, value in self._current[1].items() if value == value}
+        data["source"] = "replay"
+        return data
+
+
+def _make_readers(source, rate_hz=10.0, replay_file=None, replay_speed=1.0, catalog=None):
+    if source == "mock":
+        return [MockReader(rate_hz)]
+    if source == "replay":
+        return [ReplayReader(replay_file, replay_speed)]
+    if source == "simconnect":
+        return [SimConnectReader(catalog=catalog)]
+    if source == "fsuipc":
+        return [FsuipcReader(catalog=catalog)]
+    return [SimConnectReader(catalog=catalog), FsuipcReader(catalog=catalog)]
+
+
+class RateMonitor:
+    def __init__(self, alpha=0.1):
+        self._alpha = alpha
+        self._last = None
+        self._interval = 0.0
+        self.jitter_ms = 0.0
+
+    @property
+    def rate_hz(self):
+        return 1.0 / self._interval if self._interval > 0 else 0.0
+
+    def reset(self):
+        self._last = None
+        self._interval = 0.0
+        self.jitter_ms = 0.0
+
+    def tick(self, scheduled, actual):
+        if self._last is not None:
+            interval = actual - self._last
+            if self._interval <= 0:
+                self._interval = interval
+            else:
+                self._interval += self._alpha * (interval - self._interval)
+        lateness_ms = abs(actual - scheduled) * 1000.0
+        self.jitter_ms += self._alpha * (lateness_ms - self.jitter_ms)
+        self._last = actual
+
+
+def _sleep_until_next(deadline, period):
+    # Deadlines advance on a fixed grid so read time never accumulates as
+    # drift; after an overrun of more than a period the missed slots are
+    # dropped instead of being replayed as a burst.
+    deadline += period
+    now = time.monotonic()
+    if deadline > now:
+        time.sleep(deadline - now)
+    elif now - deadline > period:
+        deadline = now
+    return deadline
+
+
+class ReaderWorker(threading.Thread):
+    # Owns one reader: connects with exponential backoff, samples it on its own
+    # deadline grid and keeps only the latest sample. A reader that hangs or
+    # drops only stalls this thread, never the collector.
+    def __init__(
+        self,
+        reader,
+        period,
+        stale_after=0.25,
+        reconnect_after=3.0,
+        min_backoff=0.25,
+        max_backoff=8.0,
+    ):
+        super().__init__(daemon=True)
+        self._reader = reader
+        self._name = type(reader).__name__.replace("Reader", "").lower()
+        self._period = period
+        self._stale_after = max(stale_after, 3 * period)
+        self._reconnect_after = reconnect_after
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._active = threading.Event()
+        self._latest = None
+        self._last_error = None
+        self.reconnects = 0
+
+    def activate(self):
+        self._active.set()
+        # Started once: run() parks on _active between stops and starts, and
+        # returns at once for an unavailable reader, which cannot restart.
+        if self.ident is None:
+            self.start()
+
+    def deactivate(self):
+        self._active.clear()
+
+    def latest(self):
+        # Returns (sequence, data) when the last sample is fresh, else None.
+        latest = self._latest
+        if latest is None or time.monotonic() - latest[0] > self._stale_after:
+            return None
+        return latest[1], latest[2]
+
+    def run(self):
+        reader = self._reader
+        if not reader.available:
+            return
+        backoff = self._min_backoff
+        sequence = 0
+        last_good = None
+        deadline = time.monotonic()
+        while True:
+            if not self._active.is_set():
+                self._active.wait()
+                deadline = time.monotonic()
+                last_good = None
+            try:
+                connected = reader.connect()
+            except Exception as exc:
+                self._report(exc)
+                connected = False
+            if not connected:
+                self.reconnects += 1
+                _RECONNECTS.inc(self._name)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+                deadline = time.monotonic()
+                continue
+            started = time.perf_counter()
+            try:
+                data = reader.read()
+            except Exception as exc:
+                # A reader bug or bad input (a corrupt replay chunk, an odd
+                # FSUIPC value) is a failed read, not the end of this thread.
+                self._report(exc)
+                data = None
+            _READ_SECONDS.observe(time.perf_counter() - started, self._name)
+            now = time.monotonic()
+            if data:
+                sequence += 1
+                self._latest = (now, sequence, data)
+                last_good = now
+                backoff = self._min_backoff
+                deadline = _sleep_until_next(deadline, self._period)
+                continue
+            # A failed read withdraws the sample at once so the collector can
+            # fail over on its next tick; a hung read is caught by staleness.
+            _READ_FAILURES.inc(self._name)
+            self._latest = None
+            if last_good is None:
+                last_good = now
+            elif now - last_good > self._reconnect_after:
+                # Connected but silent (sim quit, pipe dropped): start over.
+                try:
+                    reader.disconnect()
+                except Exception as exc:
+                    self._report(exc)
+                last_good = None
+                continue
+            deadline = _sleep_until_next(deadline, self._period)
+
+    def _report(self, exc):
+        # Printed once per distinct error so a reader failing every tick does
+        # not flood the console.
+        message = f"{type(exc).__name__}: {exc}"
+        if message != self._last_error:
+            self._last_error = message
+            print(f"{self._name} reader error: {message}", file=sys.stderr)
+
+
+_DERIVED_FIELDS = (
+    "ground_speed_kt",
+    "track_deg",
+    "turn_rate_dps",
+    "fuel_flow_gph",
+    "distance_nm",
+)
+# Publishing thresholds for the derived fields, in the spirit of the catalog
+# deadbands; without them the smoothed values would change on every sample.
+_DERIVED_DEADBANDS = {
+    "ground_speed_kt": 0.1,
+    "track_deg": 0.1,
+    "turn_rate_dps": 0.05,
+    "fuel_flow_gph": 0.1,
+    "distance_nm": 0.01,
+}
+
+
+class DerivedMetrics:
+    # Ground speed and track from successive positions, turn rate from heading,
+    # fuel flow from the fuel quantity and distance flown, updated in O(1) per
+    # sample. Rates are smoothed with time-constant EWMAs so an irregular
+    # sample interval does not change the amount of smoothing; track is
+    # averaged as a unit vector so 359 -> 1 degrees does not swing through 180.
+    def __init__(self, speed_tau=2.0, turn_tau=2.0, fuel_tau=30.0, max_speed_kt=1500.0):
+        self._speed_tau = speed_tau
+        self._turn_tau = turn_tau
+        self._fuel_tau = fuel_tau
+        self._max_speed_kt = max_speed_kt
+        self.reset()
+
+    def reset(self):
+        self._time = None
+        self._position = None
+        self._heading = None
+        self._fuel = None
+        self._ground_speed = None
+        self._track = None
+        self._turn_rate = None
+        self._fuel_flow = None
+        self._distance = 0.0
+
+    def update(self, data, now):
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        heading = data.get("heading_deg")
+        fuel = data.get("fuel_total_gal")
+        last_time, self._time = self._time, now
+        dt = now - last_time if last_time is not None else 0.0
+        if dt > 0:
+            if isinstance(latitude, float) and self._position is not None:
+                self._advance(self._position, (latitude, longitude), dt)
+            if isinstance(heading, float) and self._heading is not None:
+                delta = (heading - self._heading + 540.0) % 360.0 - 180.0
+                self._turn_rate = self._smooth(self._turn_rate, delta / dt, dt, self._turn_tau)
+            if isinstance(fuel, float) and self._fuel is not None:
+                flow = (self._fuel - fuel) / dt * 3600.0
+                self._fuel_flow = self._smooth(self._fuel_flow, flow, dt, self._fuel_tau)
+        if isinstance(latitude, float) and isinstance(longitude, float):
+            self._position = (latitude, longitude)
+        if isinstance(heading, float):
+            self._heading = heading
+        if isinstance(fuel, float):
+            self._fuel = fuel
+        derived = {"distance_nm": self._distance}
+        if self._ground_speed is not None:
+            derived["ground_speed_kt"] = self._ground_speed
+        if self._track is not None:
+            derived["track_deg"] = math.degrees(math.atan2(*self._track)) % 360.0
+        if self._turn_rate is not None:
+            derived["turn_rate_dps"] = self._turn_rate
+        if self._fuel_flow is not None:
+            derived["fuel_flow_gph"] = self._fuel_flow
+        return derived
+
+    def _advance(self, start, end, dt):
+        distance = geo.haversine_nm(start[0], start[1], end[0], end[1])
+        speed = distance / dt * 3600.0
+        if speed > self._max_speed_kt:
+            # Slew, teleport or a new flight: restart from the new position.
+            self._ground_speed = None
+            self._track = None
+            return
+        self._distance += distance
+        self._ground_speed = self._smooth(self._ground_speed, speed, dt, self._speed_tau)
+        if distance > 1e-6:
+            bearing = math.radians(geo.bearing_deg(start[0], start[1], end[0], end[1]))
+            vector = (math.sin(bearing), math.cos(bearing))
+            if self._track is None:
+                self._track = vector
+            else:
+                alpha = 1.0 - math.exp(-dt / self._speed_tau)
+                self._track = (
+                    self._track[0] + alpha * (vector[0] - self._track[0]),
+                    self._track[1] + alpha * (vector[1] - self._track[1]),
+                )
+
+    def _smooth(self, current, value, dt, tau):
+        if current is None:
+            return value
+        return current + (1.0 - math.exp(-dt / tau)) * (value - current)
+
+
+def _is_angle(key):
+    return key.endswith("_deg") or key == "longitude"
+
+
+class RateEstimator:
+    # Rate of change (units per second) of every tracked field, from the
+    # collector's consecutive samples. A field's rate spans back to the last
+    # time its value changed, so a slow tier read once a second gives its real
+    # rate rather than a spike followed by zeros, and a value that stops moving
+    # for `hold_seconds` goes back to 0. Angles use the short way round.
+    def __init__(self, fields, hold_seconds=2.0):
+        self._fields = tuple(fields)
+        self._hold = hold_seconds
+        self._angles = frozenset(key for key in self._fields if _is_angle(key))
+        self.reset()
+
+    def reset(self):
+        self._last = {}
+        self._rates = {}
+        self._published = {}
+
+    def update(self, data, now):
+        rates = {}
+        for key in self._fields:
+            value = data.get(key)
+            if not isinstance(value, float) or value != value:
+                continue
+            last = self._last.get(key)
+            if last is None:
+                self._last[key] = (now, value)
+                continue
+            dt = now - last[0]
+            if value != last[1] and dt > 0:
+                delta = value - last[1]
+                if key in self._angles:
+                    delta = (delta + 540.0) % 360.0 - 180.0
+                self._rates[key] = delta / dt
+                self._last[key] = (now, value)
+            elif dt > self._hold:
+                self._rates[key] = 0.0
+            rate = self._rates.get(key)
+            if rate is not None:
+                rates[key] = rate
+        return rates
+
+    def changes(self, rates, data):
+        # Merges this sample's rates into the published map - the rate of every
+        # field currently moving - and returns the fields whose entry changed:
+        # those going out in `data` anyway, plus any that started or stopped
+        # moving. A stopped field leaves the map; the deadband can hold its
+        # value back for good, and clients must not keep extrapolating it.
+        changes = {}
+        published = self._published
+        for key, rate in rates.items():
+            moving = key in published
+            if key not in data and (rate != 0.0) == moving:
+                continue
+            if rate != 0.0:
+                published[key] = rate
+            elif moving:
+                del published[key]
+            changes[key] = rate
+        return changes
+
+    def published(self):
+        return dict(self._published)
+
+
+class ChangeFilter:
+    # Picks the fields of a sample worth publishing. A catalog field is only
+    # considered when its rate tier is due, and then only goes out when it has
+    # moved more than its deadband from the value last published; fields
+    # outside the catalog (source, stats) go out whenever they change.
+    _UNSET = object()
+
+    def __init__(self, catalog=None, deadbands=None):
+        catalog = catalog or VariableCatalog()
+        self._tiers = catalog.field_tiers()
+        self._deadbands = catalog.deadbands()
+        self._deadbands.update(deadbands or {})
+        self._clock = _TierClock([rate for _name, rate in catalog.tiers])
+        self._published = {}
+
+    def reset(self):
+        self._clock.reset()
+        self._published = {}
+
+    def filter(self, data, now):
+        due = self._clock.due(now)
+        changes = {}
+        for key, value in data.items():
+            tier = self._tiers.get(key)
+            if tier is not None and tier not in due:
+                continue
+            last = self._published.get(key, self._UNSET)
+            if last == value or (value != value and last != last):
+                continue
+            epsilon = self._deadbands.get(key)
+            if (
+                epsilon
+                and isinstance(value, float)
+                and isinstance(last, float)
+                and abs(value - last) <= epsilon
+            ):
+                continue
+            self._published[key] = value
+            changes[key] = value
+        return changes
+
+    def publish(self, key, value):
+        # Records a value sent outside filter(), so the deadband counts from it.
+        self._published[key] = value
+
+
 class DataCollector(threading.Thread):
-    def __init__(self, store):
+    def __init__(
+        self,
+        store,
+        rate_hz=10.0,
+        record_options=None,
+        source="auto",
+        replay_file=None,
+        replay_speed=1.0,
+        catalog=None,
+        udp_options=None,
+    ):
         super().__init__(daemon=True)
         self._store = store
         self._running = threading.Event()
-        self._sc_reader = SimConnectReader()
-        self._fs_reader = FsuipcReader()
-        self._start_time = time.time()
+        self._period = 1.0 / _clamp_rate(rate_hz)
+        self._readers = _make_readers(source, rate_hz, replay_file, replay_speed, catalog)
+        self._workers = [ReaderWorker(reader, self._period) for reader in self._readers]
+        self._monitor = RateMonitor()
+        self._filter = ChangeFilter(catalog, _DERIVED_DEADBANDS)
+        self._derived = DerivedMetrics()
+        self._rates = RateEstimator(store.fields)
+        self._stats_interval = 1.0
+        self._record_options = record_options
+        self._recorder = None
+        self._udp_options = udp_options
+        self._publisher = None
 
     def start_collecting(self):
+        if self._record_options and self._recorder is None:
+            self._recorder = FlightRecorder(
+                fields=self._store.history_fields, **self._record_options
+            )
+            self._recorder.start()
+        if self._udp_options and self._publisher is None:
+            try:
+                self._publisher = UdpPublisher(fields=self._store.fields, **self._udp_options)
+            except OSError:
+                self._publisher = None
+        for worker in self._workers:
+            worker.activate()
         self._running.set()
         if not self.is_alive():
             self.start()
 
     def stop_collecting(self):
         self._running.clear()
+        for worker in self._workers:
+            worker.deactivate()
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            recorder.stop()
+        publisher, self._publisher = self._publisher, None
+        if publisher is not None:
+            publisher.close()
 
     def run(self):
-        if self._sc_reader.available:
-            self._sc_reader.connect()
-        if self._fs_reader.available:
-            self._fs_reader.connect()
+        deadline = time.monotonic()
+        published = None
+        stats_due = 0.0
         while True:
             if not self._running.is_set():
                 time.sleep(0.2)
+                deadline = time.monotonic()
+                self._monitor.reset()
+                published = None
                 continue
-            data = None
-            if self._sc_reader.available and self._sc_reader.connect():
-                data = self._sc_reader.read()
-            if not data and self._fs_reader.available and self._fs_reader.connect():
-                data = self._fs_reader.read()
-            if not data:
-                self._store.update({"source": "unavailable"})
-                time.sleep(1.0)
-                continue
-            self._store.update(data)
-            time.sleep(1.0)
-
-    def _mock_data(self):
-        elapsed = time.time() - self._start_time
-        return {
-            "altitude_ft": 3500 + 800 * math.sin(elapsed / 8.0),
-            "heading_deg": (elapsed * 6) % 360,
-            "airspeed_kt": 120 + 25 * math.sin(elapsed / 5.0),
-            "vertical_speed_fpm": 400 * math.sin(elapsed / 4.0),
-            "latitude": 31.25 + 0.05 * math.sin(elapsed / 15.0),
-            "longitude": 121.50 + 0.05 * math.cos(elapsed / 15.0),
-            "pitch_deg": 2.5 * math.sin(elapsed / 6.0),
-            "bank_deg": 10 * math.sin(elapsed / 7.0),
-            "fuel_total_gal": 56 - (elapsed / 1200.0),
-            "source": "mock",
-        }
+            now = time.monotonic()
+            self._monitor.tick(deadline, now)
+            choice = self._select()
+            if choice is None:
+                if published != "unavailable":
+                    self._store.update({"source": "unavailable"})
+                    published = "unavailable"
+            elif choice[:2] != published:
+                if published is None or published == "unavailable" or published[0] != choice[0]:
+                    # New source: everything goes out once at full resolution.
+                    self._filter.reset()
+                    self._derived.reset()
+                    self._rates.reset()
+                published = choice[:2]
+                sample = dict(choice[2])
+                sample.update(self._derived.update(sample, now))
+                _SAMPLES.inc(str(sample.get("source", "unknown")))
+                rates = self._rates.update(sample, now)
+                data = self._filter.filter(sample, now)
+                current = self._rates.changes(rates, data)
+                if current:
+                    # Clients interpolate with these. `rates` is always the
+                    # whole map of moving fields, so any snapshot or delta is
+                    # complete on its own; a field that starts or stops goes
+                    # out with its value as of `sample_time`, deadband or not.
+                    for key in current:
+                        if key not in data:
+                            data[key] = sample[key]
+                            self._filter.publish(key, sample[key])
+                    data["sample_time"] = now
+                    data["rates"] = self._rates.published()
+                if now >= stats_due:
+                    # Rate and jitter wobble every tick; once a second is plenty
+                    # and keeps them from defeating the deadbands.
+                    data["sample_rate_hz"] = self._monitor.rate_hz
+                    data["sample_jitter_ms"] = self._monitor.jitter_ms
+                    _SAMPLE_RATE.set(self._monitor.rate_hz)
+                    _SAMPLE_JITTER.set(self._monitor.jitter_ms)
+                    stats_due = now + self._stats_interval
+                if data:
+                    self._store.update(data)
+                # The recorder and UDP consumers get the full-rate sample, not
+                # the deadbanded stream.
+                timestamp = time.time()
+                recorder = self._recorder
+                if recorder is not None:
+                    recorder.submit(timestamp, sample)
+                publisher = self._publisher
+                if publisher is not None:
+                    publisher.publish(timestamp, sample)
+            deadline = _sleep_until_next(deadline, self._period)
+
+    def _select(self):
+        # Readers are in priority order; the first one with a fresh sample
+        # wins. Sticking to priority instead of switching to whichever sample
+        # is newest keeps two healthy sources from interleaving every tick.
+        for index, worker in enumerate(self._workers):
+            latest = worker.latest()
+            if latest is not None:
+                return (index,) + latest
+        return None
 
 
 class FlightDataApp:
@@ -444,10 +3655,16 @@ class FlightDataApp:
         self.current_url = f"http://127.0.0.1:{port}"
         self.current_ip = "--"
 
-        self.store = DataStore()
-        self.collector = DataCollector(self.store)
-        self.server_thread = None
-        self.server = None
+        self.service = FlightDataService()
+        self.settings = self.service.settings
+        self.store = self.service.store
+        # The collector only flags new samples; the Tk loop picks them up at
+        # most ui_fps times a second and redraws only labels whose text moved.
+        self._ui_dirty = threading.Event()
+        self._ui_interval_ms = int(1000 / _clamp_rate(self.settings.get("ui_fps"), 30.0))
+        self._label_texts = {}
+        self.store.add_listener(self._ui_dirty.set)
+        self._ui_dirty.set()
 
         self.theme = self._theme_dark()
         self.theme_dialog = None
@@ -945,40 +4162,45 @@ class FlightDataApp:
         return True
 
     def _start_collecting(self):
-        self.collector.start_collecting()
+        self.service.start_collecting()
         self._set_status("running")
 
     def _stop_collecting(self):
-        self.collector.stop_collecting()
+        self.service.stop_collecting()
         self._set_status("stopped")
 
     def _start_server(self):
-        if self.server_thread and self.server_thread.is_alive():
+        if self.service.serving:
             return
         ip = self._get_local_ip()
         port = self._load_port()
-        self.server = DataServer(
-            "0.0.0.0", port, self.store.snapshot, static_dir=os.getcwd()
-        )
-        self.server_thread = threading.Thread(target=self.server.start, daemon=True)
-        self.server_thread.start()
+        self.service.start_server("0.0.0.0", port)
         if ip:
             self._set_link(f"http://{ip}:{port}")
             self._set_ip(ip)
         self._set_status("exported")
 
     def _schedule_ui_refresh(self):
+        if self._ui_dirty.is_set():
+            self._ui_dirty.clear()
+            self._refresh_values()
+        self.root.after(self._ui_interval_ms, self._schedule_ui_refresh)
+
+    def _refresh_values(self):
         data = self.store.snapshot()
+        texts = self._label_texts
         for key, (label, unit) in self.value_labels.items():
             value = data.get(key, 0.0)
             if isinstance(value, float):
                 text = f"{value:.2f} {unit}".strip()
             else:
                 text = f"{value} {unit}".strip()
-            label.config(text=text)
+            if texts.get(key) != text:
+                texts[key] = text
+                label.config(text=text)
         source = data.get("source", "idle")
-        self._set_source(source)
-        self.root.after(800, self._schedule_ui_refresh)
+        if source != self.source_key:
+            self._set_source(source)
 
     def _get_local_ip(self):
         try:
@@ -1064,9 +4286,186 @@ class FlightDataApp:
         confirm.pack(pady=(0, 16))
 
 
-def main():
-    port = _load_port_value()
+def _parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MSFS flight data export")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run the collector and web server without the desktop UI",
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="headless: listen address")
+    parser.add_argument("--port", type=int, help="headless: web port (default: port.txt)")
+    parser.add_argument("--rate", type=float, help="headless: sample rate in Hz")
+    parser.add_argument(
+        "--source",
+        choices=["auto", "simconnect", "fsuipc", "mock", "replay"],
+        help="headless: data source",
+    )
+    parser.add_argument("--replay-file", help="headless: flight log for --source replay")
+    parser.add_argument(
+        "--backend", choices=["threading", "asyncio"], help="headless: server backend"
+    )
+    return parser.parse_args(argv)
+
+
+def _store_fields(catalog):
+    # (fields, history_fields): the catalog variables plus the fields
+    # DerivedMetrics adds to every sample. The local store and every fleet
+    # seat use the same lists.
+    return catalog.fields + _DERIVED_FIELDS, catalog.history_fields + _DERIVED_FIELDS
+
+
+def _make_store(catalog, settings):
+    fields, history_fields = _store_fields(catalog)
+    return DataStore(
+        fields=fields,
+        history_capacity=settings.get("history_capacity", 72000),
+        history_fields=history_fields,
+    )
+
+
+def _make_fleet(catalog, seat_id, store):
+    fields, history_fields = _store_fields(catalog)
+    fleet = FleetStore(fields=fields, history_fields=history_fields)
+    fleet.add(seat_id, store)
+    return fleet
+
+
+class FlightDataService:
+    # The wiring shared by the desktop UI and headless mode: store and
+    # collector built from settings and the catalog, the fleet, and the web
+    # server, fleet ingest and fleet feeder around them.
+    def __init__(self, settings=None):
+        self.settings = _load_settings() if settings is None else settings
+        self.catalog = _load_catalog()
+        self.store = _make_store(self.catalog, self.settings)
+        self.collector = DataCollector(
+            self.store,
+            rate_hz=self.settings.get("sample_rate_hz"),
+            record_options=_record_options(self.settings),
+            source=self.settings.get("source", "auto"),
+            replay_file=self.settings.get("replay_file"),
+            replay_speed=_float_setting(self.settings, "replay_speed", 1.0),
+            catalog=self.catalog,
+            udp_options=_udp_options(self.settings),
+        )
+        self.seat_id = str(self.settings.get("seat_id") or socket.gethostname())
+        self.fleet = _make_fleet(self.catalog, self.seat_id, self.store)
+        self.server = None
+        self.server_thread = None
+        self.fleet_ingest = None
+        self.feeder = None
+
+    @property
+    def serving(self):
+        return self.server_thread is not None and self.server_thread.is_alive()
+
+    def start_collecting(self):
+        self.collector.start_collecting()
+        upstream = _fleet_upstream(self.settings)
+        if upstream and self.feeder is None:
+            self.feeder = FleetFeeder(self.store, self.seat_id, *upstream)
+            self.feeder.start()
+
+    def stop_collecting(self):
+        self.collector.stop_collecting()
+
+    def start_server(self, host, port):
+        # Starts the web server (and the fleet ingest port, if configured) on
+        # background threads; the caller can wait_ready() on the result.
+        self.server = DataServer(
+            host,
+            port,
+            self.store,
+            static_dir=os.getcwd(),
+            backend=self.settings.get("server_backend", "threading"),
+            max_connections=self.settings.get("server_max_connections", 512),
+            fleet=self.fleet,
+            record_dir=_record_dir(self.settings),
+        )
+        self.server_thread = threading.Thread(target=self.server.start, daemon=True)
+        self.server_thread.start()
+        try:
+            fleet_port = int(self.settings.get("fleet_port") or 0)
+        except (TypeError, ValueError):
+            fleet_port = 0
+        if fleet_port and self.fleet_ingest is None:
+            self.fleet_ingest = FleetIngestServer(self.fleet, host, fleet_port)
+            threading.Thread(target=self.fleet_ingest.start, daemon=True).start()
+        return self.server
+
+    def shutdown(self):
+        feeder, self.feeder = self.feeder, None
+        if feeder is not None:
+            feeder.stop()
+        self.collector.stop_collecting()
+        ingest, self.fleet_ingest = self.fleet_ingest, None
+        if ingest is not None:
+            ingest.stop()
+        if self.server is not None:
+            self.server.stop()
+
+
+def _run_headless(args, port):
+    started = time.perf_counter()
+    settings = _load_settings()
+    for key, value in (
+        ("sample_rate_hz", args.rate),
+        ("source", args.source),
+        ("replay_file", args.replay_file),
+        ("server_backend", args.backend),
+    ):
+        if value is not None:
+            settings[key] = value
+    service = FlightDataService(settings)
+    server = service.start_server(args.host, port)
+    if not server.wait_ready(10.0):
+        print(f"could not listen on {args.host}:{port}", file=sys.stderr)
+        service.shutdown()
+        return 1
+    service.start_collecting()
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    report = f"ready in {elapsed_ms:.0f} ms, process CPU {time.process_time() * 1000.0:.0f} ms"
+    try:
+        import resource
+
+        # ru_maxrss is KiB on Linux.
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report += f", peak RSS {rss / 1024.0:.1f} MiB"
+    except ImportError:
+        pass
+    print(
+        f"serving http://{args.host}:{port} from {settings.get('source', 'auto')} "
+        f"({report})",
+        flush=True,
+    )
+
+    stopping = threading.Event()
+    try:
+        import signal
+
+        signal.signal(signal.SIGTERM, lambda _signum, _frame: stopping.set())
+    except (ImportError, ValueError, AttributeError):
+        pass
+    try:
+        # Short waits keep Ctrl+C responsive on Windows.
+        while not stopping.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    service.shutdown()
+    return 0
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    port = args.port if args.port is not None else _load_port_value()
     _ensure_firewall_rule(port)
+    if args.headless:
+        sys.exit(_run_headless(args, port))
+    _load_tk()
     root = tk.Tk()
     app = FlightDataApp(root)
     root.mainloop()
@@ -0,0 +1,151 @@
+// Smooth display values between samples from /data or /stream.
+//
+// Each update carries `sample_time` (server monotonic seconds) and `rates`
+// (units per second) for every field currently moving; a field seen before
+// that is missing from `rates` has stopped. Field values in an update hold as
+// of its `sample_time`. Deltas may leave `rates` out when it did not change. Displays are rendered slightly in the past - about one
+// sample interval - so there is almost always a sample on each side to
+// interpolate between (cubic Hermite, using both values and rates). Past the
+// newest sample values are extrapolated along their rate for at most
+// `maxExtrapolation` seconds, then ease back to that sample over as long again:
+// a field that stops getting samples settles on its last known value rather
+// than a guess. Angles wrap, so 359 -> 1 degrees turns 2 degrees, not 358.
+//
+//   const interp = new SampleInterpolator();
+//   stream.onmessage = (e) => interp.push(JSON.parse(e.data));
+//   const frame = () => { gauge.set(interp.value("heading_deg")); requestAnimationFrame(frame); };
+(function (global) {
+  "use strict";
+
+  const DEFAULT_WRAP = {
+    heading_deg: 360,
+    track_deg: 360,
+    bank_deg: 360,
+    pitch_deg: 360,
+    longitude: 360,
+  };
+
+  const nowSeconds = () => performance.now() / 1000;
+
+  const shortestDelta = (from, to, period) => {
+    const delta = (to - from) % period;
+    if (delta > period / 2) return delta - period;
+    if (delta < -period / 2) return delta + period;
+    return delta;
+  };
+
+  class SampleInterpolator {
+    constructor(options = {}) {
+      this.wrap = { ...DEFAULT_WRAP, ...(options.wrap || {}) };
+      this.signed = new Set(options.signed || ["bank_deg", "pitch_deg", "longitude"]);
+      this.maxExtrapolation = options.maxExtrapolation ?? 0.5;
+      this.fixedDelay = options.delay ?? null;
+      this.reset();
+    }
+
+    reset() {
+      this.fields = {};
+      this.rates = {};
+      this.offset = null;
+      this.interval = 0.1;
+      this.lastSampleTime = null;
+    }
+
+    get delay() {
+      if (this.fixedDelay !== null) return this.fixedDelay;
+      return Math.min(this.interval * 1.2, 0.5);
+    }
+
+    push(data, receivedAt = nowSeconds()) {
+      const time = data.sample_time;
+      if (typeof time !== "number") return;
+      if (this.lastSampleTime !== null && time < this.lastSampleTime - 1) {
+        // The server restarted: its monotonic clock starts over.
+        this.reset();
+      }
+      if (this.lastSampleTime !== null && time <= this.lastSampleTime) return;
+      if (this.lastSampleTime !== null) {
+        const gap = time - this.lastSampleTime;
+        this.interval += (Math.min(gap, 1) - this.interval) * 0.1;
+      }
+      this.lastSampleTime = time;
+      if (data.rates && typeof data.rates === "object") this.rates = data.rates;
+      const rates = this.rates;
+
+      // Local clock minus server clock, from the fastest delivery seen; it
+      // creeps back up slowly so a longer network path is picked up too.
+      const observed = receivedAt - time;
+      if (this.offset === null || observed < this.offset) {
+        this.offset = observed;
+      } else {
+        this.offset += (observed - this.offset) * 0.02;
+      }
+
+      const keys = new Set([...Object.keys(rates), ...Object.keys(this.fields)]);
+      keys.forEach((key) => {
+        let value = data[key];
+        const rate = key in rates ? rates[key] : 0;
+        if (typeof value !== "number" || typeof rate !== "number") return;
+        const field = this.fields[key] || (this.fields[key] = []);
+        const previous = field[field.length - 1];
+        const period = this.wrap[key];
+        if (previous && period) {
+          // Stored unwrapped so interpolation never runs the long way round.
+          value = previous.value + shortestDelta(previous.value, value, period);
+        }
+        field.push({ time, value, rate });
+        if (field.length > 4) field.shift();
+      });
+    }
+
+    has(key) {
+      return Boolean(this.fields[key] && this.fields[key].length);
+    }
+
+    value(key, at = nowSeconds()) {
+      const field = this.fields[key];
+      if (!field || !field.length || this.offset === null) return undefined;
+      const time = at - this.offset - this.delay;
+      let last = field[field.length - 1];
+      let value;
+      if (time >= last.time || field.length === 1) {
+        const limit = this.maxExtrapolation;
+        const age = Math.max(time - last.time, 0);
+        let ahead = Math.min(age, limit);
+        if (age > limit) ahead *= Math.max(1 - (age - limit) / limit, 0);
+        value = last.value + last.rate * ahead;
+      } else {
+        let index = field.length - 2;
+        while (index > 0 && field[index].time > time) index -= 1;
+        const first = field[index];
+        last = field[index + 1];
+        const span = last.time - first.time;
+        if (time <= first.time) {
+          value = first.value;
+        } else if (span > this.interval * 4) {
+          // A field held back by its deadband: rates at both ends say little
+          // about the long gap, so move straight across it.
+          value = first.value + ((last.value - first.value) * (time - first.time)) / span;
+        } else {
+          const u = (time - first.time) / span;
+          const u2 = u * u;
+          const u3 = u2 * u;
+          value =
+            (2 * u3 - 3 * u2 + 1) * first.value +
+            (u3 - 2 * u2 + u) * span * first.rate +
+            (-2 * u3 + 3 * u2) * last.value +
+            (u3 - u2) * span * last.rate;
+        }
+      }
+      const period = this.wrap[key];
+      if (!period) return value;
+      // [0, period) for compass angles; signed ones (bank, pitch, longitude)
+      // come back in (-period/2, period/2].
+      const wrapped = ((value % period) + period) % period;
+      if (this.signed.has(key) && wrapped > period / 2) return wrapped - period;
+      return wrapped;
+    }
+  }
+
+  global.SampleInterpolator = SampleInterpolator;
+})(typeof window !== "undefined" ? window : globalThis);
@@ -0,0 +1,67 @@
+import io
+import math
+import os
+from array import array
+
+import pytest
+
+import export
+import flight_log
+from gui import FlightHistory
+
+
+def _chunks():
+    yield (
+        ["altitude_ft", "airspeed_kt"],
+        array("d", [1000.0, 1000.5]),
+        [array("f", [1500.0, math.nan]), array("d", [120.0, 121.0])],
+    )
+
+
+def test_iso_time_carries_rounded_milliseconds():
+    assert export._iso_time(1792193994.9996) == "2026-10-16T23:39:55.000Z"
+    assert export._iso_time(1792193994.25) == "2026-10-16T23:39:54.250Z"
+
+
+def test_csv_without_samples_keeps_header():
+    layout = [("altitude_ft", "f"), ("airspeed_kt", "d")]
+    body = b"".join(export.encode("csv", iter(()), layout=layout))
+    assert body == b"time,altitude_ft,airspeed_kt\r\n"
+
+
+def test_parquet_round_trip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    layout = [("altitude_ft", "f"), ("airspeed_kt", "d")]
+    body = b"".join(export.encode("parquet", _chunks(), layout=layout))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.column_names == ["time", "altitude_ft", "airspeed_kt"]
+    assert str(table.schema.field("altitude_ft").type) == "float"
+    assert table.column("altitude_ft").to_pylist() == [1500.0, None]
+    assert table.column("airspeed_kt").to_pylist() == [120.0, 121.0]
+
+
+def test_parquet_without_samples_is_a_valid_file():
+    pq = pytest.importorskip("pyarrow.parquet")
+    layout = [("altitude_ft", "f"), ("airspeed_kt", "d")]
+    body = b"".join(export.encode("parquet", iter(()), layout=layout))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.num_rows == 0
+    assert table.column_names == ["time", "altitude_ft", "airspeed_kt"]
+
+
+def test_parquet_from_log(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = os.path.join(tmp_path, "flight" + flight_log.EXTENSION)
+    writer = flight_log.FlightLogWriter(path, ["altitude_ft"])
+    writer.close()
+    body = b"".join(export.encode("parquet", flight_log.iter_chunks(path), layout=export.log_layout(path)))
+    assert pq.read_table(io.BytesIO(body)).column_names == ["time", "altitude_ft"]
+
+
+def test_history_chunks_keep_samples_sharing_a_timestamp():
+    history = FlightHistory(["altitude_ft"], capacity=16)
+    for index in range(10):
+        history.append(100.0 + index // 4, {"altitude_ft": float(index)})
+    chunks = list(history.iter_chunks(size=3))
+    values = [value for _fields, _times, columns in chunks for value in columns[0]]
+    assert values == [float(index) for index in range(10)]
@@ -0,0 +1,121 @@
+import ctypes
+import struct
+import types
+
+import gui
+
+
+def _catalog():
+    return gui.VariableCatalog(
+        [
+            {"name": "altitude_ft", "simconnect": {"var": "PLANE ALTITUDE", "unit": "feet"}},
+            {"name": "heading_deg", "simconnect": {"var": "PLANE HEADING DEGREES TRUE", "unit": "degrees"}},
+            {
+                "name": "fuel_total_gal",
+                "tier": "slow",
+                "simconnect": {"var": "FUEL TOTAL QUANTITY", "unit": "gallons"},
+            },
+        ],
+        {"fast": 0, "slow": 1},
+    )
+
+
+class _FakeDll:
+    def __init__(self):
+        self.definitions = []
+        self.requests = []
+
+    def AddToDataDefinition(self, handle, define_id, simvar, unit, datatype, epsilon, datum):
+        self.definitions.append((define_id, simvar.decode("utf-8")))
+
+    def RequestDataOnSimObject(self, handle, request_id, define_id, object_id, period, *rest):
+        self.requests.append((request_id, define_id, period))
+
+    @staticmethod
+    def DispatchProc(function):
+        return function
+
+
+class _FakeSimConnect:
+    # Dispatches like the SimConnect package: its run loop calls whatever
+    # my_dispatch_proc_rd holds, and its own proc ignores SIMOBJECT_DATA.
+    def __init__(self):
+        self.dll = _FakeDll()
+        self.hSimConnect = object()
+        self.unhandled = []
+        self.my_dispatch_proc_rd = self.dll.DispatchProc(self.my_dispatch_proc)
+
+    def my_dispatch_proc(self, data, size, context):
+        self.unhandled.append(ctypes.cast(data, ctypes.POINTER(gui._SimConnectRecv)).contents.dwID)
+
+    def emit(self, recv_id, request_id, values):
+        body = struct.pack("<7I", request_id, 0, request_id, 0, 0, 0, len(values))
+        body += struct.pack(f"<{len(values)}d", *values)
+        raw = struct.pack("<3I", 12 + len(body), 1, recv_id) + body
+        buffer = ctypes.create_string_buffer(raw, len(raw))
+        self.my_dispatch_proc_rd(ctypes.cast(buffer, ctypes.POINTER(gui._SimConnectRecv)), len(raw), None)
+
+    def exit(self):
+        return
+
+
+def _reader():
+    connections = []
+
+    def connect():
+        connections.append(_FakeSimConnect())
+        return connections[-1]
+
+    module = types.SimpleNamespace(SimConnect=connect, AircraftRequests=None)
+    reader = gui.SimConnectReader(module=module, catalog=_catalog())
+    assert reader.connect()
+    return reader, connections[-1]
+
+
+def test_one_definition_per_tier():
+    reader, sm = _reader()
+    assert reader.subscribed
+    assert [request[0] for request in sm.dll.requests] == [
+        gui._SIMCONNECT_REQUEST_ID,
+        gui._SIMCONNECT_REQUEST_ID + 1,
+    ]
+    assert len(sm.dll.definitions) == 3
+
+
+def test_read_returns_values_from_simobject_data_frames():
+    reader, sm = _reader()
+    assert reader.read() is None
+    sm.emit(gui._SIMCONNECT_RECV_ID_SIMOBJECT_DATA, gui._SIMCONNECT_REQUEST_ID, [3500.0, 271.5])
+    sm.emit(gui._SIMCONNECT_RECV_ID_SIMOBJECT_DATA, gui._SIMCONNECT_REQUEST_ID + 1, [42.25])
+    assert reader.read() == {
+        "source": "simconnect",
+        "altitude_ft": 3500.0,
+        "heading_deg": 271.5,
+        "fuel_total_gal": 42.25,
+    }
+    assert sm.unhandled == []
+
+
+def test_other_messages_reach_the_package():
+    reader, sm = _reader()
+    sm.emit(gui._SIMCONNECT_RECV_ID_SIMOBJECT_DATA, 7, [1.0])
+    sm.emit(2, 0, [])
+    assert sm.unhandled == [gui._SIMCONNECT_RECV_ID_SIMOBJECT_DATA, 2]
+    assert reader.read() is None
+
+
+def test_falls_back_to_polling_without_frames():
+    class Requests:
+        def __init__(self, simconnect, _time):
+            self.simconnect = simconnect
+
+        def get(self, name):
+            return {"PLANE_ALTITUDE": 1200, "FUEL_TOTAL_QUANTITY": 40}.get(name, 0)
+
+    module = types.SimpleNamespace(SimConnect=_FakeSimConnect, AircraftRequests=Requests)
+    reader = gui.SimConnectReader(module=module, catalog=_catalog())
+    assert reader.connect() and reader.subscribed
+    reader._subscribed_at -= 10.0
+    assert reader.read() is None
+    assert not reader.subscribed
+    assert reader.read()["altitude_ft"] == 1200.0
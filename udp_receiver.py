@@ -0,0 +1,122 @@
+import argparse
+import socket
+import struct
+import time
+
+# Reference receiver for the UDP telemetry published by gui.py (udp_target in
+# settings.json). The datagram layout is documented next to UdpPublisher in
+# gui.py; this file only needs the standard library so it can be copied into
+# other tools as is.
+MAGIC = b"FDXU"
+SCHEMA_MAGIC = b"FDXS"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIId")
+_SCHEMA_HEADER = struct.Struct("<4sHHI")
+
+
+def _parse_schema(datagram):
+    magic, version, count, layout = _SCHEMA_HEADER.unpack_from(datagram)
+    if magic != SCHEMA_MAGIC or version != VERSION:
+        return None
+    fields = []
+    typecodes = []
+    pos = _SCHEMA_HEADER.size
+    for _ in range(count):
+        size = datagram[pos]
+        fields.append(datagram[pos + 1:pos + 1 + size].decode("utf-8"))
+        typecodes.append(datagram[pos + 1 + size:pos + 2 + size].decode("ascii"))
+        pos += size + 2
+    return layout, fields, struct.Struct("<" + "".join(typecodes))
+
+
+class UdpReceiver:
+    # Decodes samples once a schema datagram for their layout has arrived and
+    # keeps loss statistics from the sequence numbers.
+    def __init__(self, port, host="", group=None, timeout=1.0):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        if group:
+            membership = socket.inet_aton(group) + socket.inet_aton("0.0.0.0")
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self._sock.settimeout(timeout)
+        self._layouts = {}
+        self._last_sequence = None
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.undecoded = 0
+
+    def receive(self):
+        # Returns (sequence, timestamp, {field: value}) for the next sample, or
+        # None on timeout.
+        while True:
+            try:
+                datagram = self._sock.recv(65536)
+            except socket.timeout:
+                return None
+            if datagram[:4] == SCHEMA_MAGIC:
+                schema = _parse_schema(datagram)
+                if schema is not None:
+                    self._layouts[schema[0]] = schema[1:]
+                continue
+            if len(datagram) < _HEADER.size or datagram[:4] != MAGIC:
+                continue
+            _magic, version, _count, layout, sequence, timestamp = _HEADER.unpack_from(datagram)
+            if version != VERSION:
+                continue
+            self._track(sequence)
+            schema = self._layouts.get(layout)
+            if schema is None:
+                self.undecoded += 1
+                continue
+            fields, values = schema
+            try:
+                decoded = values.unpack_from(datagram, _HEADER.size)
+            except struct.error:
+                self.undecoded += 1
+                continue
+            return sequence, timestamp, dict(zip(fields, decoded))
+
+    def close(self):
+        self._sock.close()
+
+    def _track(self, sequence):
+        self.received += 1
+        last = self._last_sequence
+        if last is not None:
+            gap = (sequence - last) & 0xFFFFFFFF
+            if gap == 0 or gap > 0x7FFFFFFF:
+                self.reordered += 1
+                return
+            self.lost += gap - 1
+        self._last_sequence = sequence
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print UDP flight telemetry")
+    parser.add_argument("--port", type=int, default=49005)
+    parser.add_argument("--group", help="multicast group to join, e.g. 239.255.70.68")
+    parser.add_argument("--fields", help="comma-separated fields to print")
+    args = parser.parse_args()
+    wanted = [key for key in (args.fields or "").split(",") if key]
+    receiver = UdpReceiver(args.port, group=args.group)
+    try:
+        while True:
+            sample = receiver.receive()
+            if sample is None:
+                continue
+            sequence, timestamp, data = sample
+            latency_ms = (time.time() - timestamp) * 1000.0
+            shown = {key: data[key] for key in wanted if key in data} if wanted else data
+            values = " ".join(f"{key}={value:.6g}" for key, value in shown.items())
+            print(f"#{sequence} +{latency_ms:.1f}ms lost={receiver.lost} {values}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+
+
+if __name__ == "__main__":
+    main()